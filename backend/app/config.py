@@ -13,6 +13,124 @@ class Settings(BaseSettings):
 
     FRONTEND_URL: str = "http://localhost:5173"
 
+    # Upstream HTTP connection pools (one per host, shared app-wide)
+    HTTP2_ENABLED: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_S: float = 30.0
+    USGS_TIMEOUT_S: float = 8.0
+    NWS_TIMEOUT_S: float = 8.0
+    GOOGLE_TIMEOUT_S: float = 8.0
+
+    # Bounded executors for CPU-bound work (see executors.py)
+    EXECUTOR_INFERENCE_WORKERS: int = 2
+    EXECUTOR_INFERENCE_QUEUE: int = 64        # waiting calls before 503
+    EXECUTOR_AUTH_WORKERS: int = 2            # bcrypt ≈ 250 ms per call
+    EXECUTOR_AUTH_QUEUE: int = 32
+    EXECUTOR_ROUTING_WORKERS: int = 2         # statewide A* ≈ tens to hundreds of ms
+    EXECUTOR_ROUTING_QUEUE: int = 16
+
+    # Upstream circuit breakers
+    CIRCUIT_FAILURE_THRESHOLD: int = 5        # consecutive failures before opening
+    CIRCUIT_RESET_TIMEOUT_S: float = 30.0     # open → half-open probe delay
+
+    # USGS statewide gauge snapshot (USGS IV data updates every ~15 min)
+    USGS_POLL_INTERVAL_S: float = 900.0
+    USGS_SITES_PER_REQUEST: int = 100          # USGS IV caps the sites= list per request
+    GAUGE_SITES_PATH: str = ""                 # gauge registry JSON; empty → bundled app/data/nj_gauges.json
+
+    # Per-gauge reading history (ring buffer per site)
+    GAUGE_HISTORY_CAPACITY: int = 2048        # readings kept per site (~21 days at 15 min)
+    GAUGE_HISTORY_SEED_PERIOD: str = "P1D"    # history fetched on the first poll
+    GAUGE_RATE_WINDOW_S: float = 900.0        # window for change_rate_ft_per_hr
+    GAUGE_STALE_AFTER_S: float = 10800.0      # treat a gauge as down after 3 h silent
+    GAUGE_LOOKUP_K: int = 8                   # nearest gauges checked for a fresh snapshot entry
+
+    # Hedged live gauge lookup (used until the first snapshot lands)
+    GAUGE_HEDGE_K: int = 3                    # nearest gauges tried
+    GAUGE_HEDGE_DELAY_S: float = 0.75         # head start before the next gauge is tried
+    GAUGE_DEADLINE_S: float = 8.0             # overall cap on one lookup
+
+    # FEMA flood-zone polygons (GeoJSON); empty → bundled app/data/nj_flood_zones.geojson
+    FLOOD_ZONES_PATH: str = ""
+
+    # NWS caches: permanent points → grid cell file, TTL forecast cache
+    NWS_GRID_CACHE_PATH: str = "./nws_grid_cache.json"
+    NWS_GRID_CACHE_MAX: int = 50000           # points kept (oldest evicted first)
+    NWS_GRID_SAVE_DELAY_S: float = 30.0       # new points are written in one batch after this
+    NWS_FORECAST_TTL_S: float = 3600.0        # used when NWS sends no cache headers
+
+    # Google Maps response cache (see response_cache.py)
+    GOOGLE_CACHE_MAX_ENTRIES: int = 5000      # in-memory entries per response kind
+    GEOCODE_CACHE_TTL_S: float = 2592000.0    # 30 days — addresses don't move
+    REVERSE_GEOCODE_CACHE_TTL_S: float = 2592000.0
+    DIRECTIONS_CACHE_TTL_S: float = 900.0     # durations track traffic; 0 disables
+    GOOGLE_CACHE_DB_PATH: str = ""            # SQLite file for a persistent tier; empty → memory only
+
+    # Autocomplete: local prefix index, then Google (see place_search.py)
+    AUTOCOMPLETE_PLACES_PATH: str = ""        # empty → bundled app/data/nj_places.json
+    AUTOCOMPLETE_CACHE_TTL_S: float = 3600.0  # suggestions cached per prefix
+    AUTOCOMPLETE_CACHE_MAX: int = 20_000
+    AUTOCOMPLETE_LEARN_ADDRESSES: bool = False  # suggest geocoded addresses to all users (opt-in)
+    AUTOCOMPLETE_LEARN_MIN_LOOKUPS: int = 3   # geocodes of an address before it is learned
+    AUTOCOMPLETE_LEARN_WINDOW_S: float = 86400.0
+    AUTOCOMPLETE_MAX_ADDRESSES: int = 20_000  # learned addresses kept (oldest dropped first)
+
+    # Offline routing over a local road graph (see road_graph.py)
+    ROAD_GRAPH_PATH: str = ""                 # .npz from `road_graph build`; empty → /route/local disabled
+    ROAD_GRAPH_LANDMARKS: int = 16            # ALT landmarks computed at build time
+    ROAD_ALT_ACTIVE_LANDMARKS: int = 4        # landmarks used per query
+    ROAD_GRAPH_MAX_SNAP_M: float = 2000.0     # max distance from a point to the road network
+    ROAD_PENALTY_MODERATE: float = 1.5        # travel-time multipliers by edge risk level
+    ROAD_PENALTY_HIGH: float = 4.0
+    ROAD_PENALTY_SEVERE: float = 25.0         # only if closing severe edges leaves no route
+
+    # Local safe-place index (see safe_places.py)
+    SAFE_PLACES_PATH: str = "./safe_places.json"   # writable store; seeded on first load
+    SAFE_PLACES_SEED_PATH: str = ""           # empty → bundled app/data/nj_safe_places.json
+    SAFE_PLACES_MAX_KM: float = 20.0          # SafeZone search radius
+    SAFE_PLACES_EMPTY_TTL_S: float = 900.0    # skip Google for an area whose refresh added nothing
+
+    # Flood model artifact store (see model_store.py)
+    MODEL_ARTIFACT_DIR: str = "./model_artifacts"
+    MODEL_VERSION: str = ""                   # empty → version named in CURRENT
+    MODEL_WATCH_INTERVAL_S: float = 30.0      # how often CURRENT / SHADOW are re-read
+    MODEL_SHADOW_SAMPLE_RATE: float = 0.05    # fraction of scoring calls mirrored to the shadow model
+    MODEL_SHADOW_QUEUE_MAX: int = 256         # pending shadow batches before samples are dropped
+
+    # Route scoring: score candidate routes alongside the primary instead of
+    # only after it comes back High/Severe. Faster high-risk responses, but
+    # every /route then does up to ~6× the inference and upstream work (one
+    # scoring pass per candidate), so it is off unless capacity allows
+    ROUTE_SPECULATIVE_SCORING: bool = False
+    ROUTE_SAMPLE_INTERVAL_M: float = 200.0    # spacing of risk samples along a route
+    ROUTE_MAX_SAMPLES: int = 2000             # per route; interval widens on long trips
+    ROUTE_NWS_SNAP_DEG: float = 0.02          # NWS grid lookups per ~2 km (cells are 2.5 km)
+
+    # POST /flood/risk/batch
+    RISK_BATCH_MAX_POINTS: int = 1000
+
+    # Statewide risk raster served as map tiles (see risk_grid.py)
+    RISK_GRID_ENABLED: bool = True
+    RISK_GRID_RES_DEG: float = 0.005          # cell size (~500 m)
+    RISK_GRID_FORECAST_DEG: float = 0.1       # NWS forecast lattice (~10 km; one lookup per lattice cell)
+    RISK_GRID_NWS_CONCURRENCY: int = 8        # NWS lookups in flight during a grid refresh
+    RISK_GRID_CHECK_INTERVAL_S: float = 60.0  # how often inputs are checked for changes
+    RISK_TILE_CACHE_MAX: int = 4096           # encoded PNG tiles kept in memory
+    RISK_TILE_MAX_ZOOM: int = 18
+
+    # Live risk push over Server-Sent Events (GET /flood/risk/stream)
+    RISK_STREAM_MAX_SUBSCRIBERS: int = 10_000
+    RISK_STREAM_MAX_POINTS: int = 500
+    RISK_STREAM_KEEPALIVE_S: float = 25.0     # comment line sent on idle streams
+    RISK_STREAM_RETRY_MS: int = 10_000        # client reconnect delay (SSE retry:)
+
+    # Quantized-feature risk-score memoization (off → exact inference; see risk_cache.py)
+    RISK_CACHE_ENABLED: bool = False
+    RISK_CACHE_RATIO_STEP: float = 0.01       # gauge height / flood stage bucket
+    RISK_CACHE_RATE_STEP: float = 0.01        # ft/hr bucket
+    RISK_CACHE_MAX_ENTRIES: int = 50_000
+
     class Config:
         env_file = ".env"
 
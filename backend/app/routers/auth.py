@@ -9,6 +9,7 @@ from app.config import settings
 from app.database import get_db
 from app.models.user import User
 from app.schemas.auth import UserRegister, UserLogin, TokenResponse
+from app.services.executors import auth_executor
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -46,7 +47,7 @@ async def register(body: UserRegister, db: AsyncSession = Depends(get_db)):
     user = User(
         username=body.username,
         email=body.email,
-        hashed_password=hash_password(body.password),
+        hashed_password=await auth_executor.run(hash_password, body.password),
         language=body.language,
     )
     db.add(user)
@@ -62,7 +63,7 @@ async def login(body: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.username == body.username))
     user: User | None = result.scalar_one_or_none()
 
-    if not user or not verify_password(body.password, user.hashed_password):
+    if not user or not await auth_executor.run(verify_password, body.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     token = create_token({"sub": str(user.id), "username": user.username})
@@ -1,9 +1,21 @@
-from fastapi import APIRouter
-from datetime import datetime
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timezone
+from typing import Optional
 
-from app.schemas.flood import FloodRiskRequest, FloodRiskResponse
-from app.services.flood_ml import flood_model
-from app.services.usgs_service import get_stream_gauge_data
+from app.config import settings
+from app.schemas.flood import (
+    FloodRiskRequest, FloodRiskResponse, FloodRiskBatchRequest, FloodRiskBatchResponse,
+    GaugeSummary, GaugeHistoryResponse, ModelStatusResponse,
+)
+from app.services.executors import inference_executor
+from app.services.flood_ml import LEVEL_NAMES, flood_model, model_registry, recommendation
+from app.services.risk_batch import assess_points, confidence
+from app.services.risk_cache import risk_cache
+from app.services.risk_events import risk_hub, subscription_stream
+from app.services.risk_grid import risk_grid
+from app.services.gauge_history import buffer_for
+from app.services.usgs_service import get_stream_gauge_data, NJ_GAUGE_SITES
 from app.services.nws_service import get_precip_forecast
 
 router = APIRouter(prefix="/flood", tags=["flood"])
@@ -20,40 +32,223 @@ async def get_flood_risk(body: FloodRiskRequest):
     gauge_data  = await get_stream_gauge_data(body.lat, body.lng)
     precip_data = await get_precip_forecast(body.lat, body.lng)
 
-    result = flood_model.assess_location(
-        lat=body.lat,
-        lng=body.lng,
-        stream_gauge_height=gauge_data["gauge_height_ft"],
-        gauge_change_rate=gauge_data["change_rate_ft_per_hr"],
+    batch = await inference_executor.run(
+        flood_model.assess_many,
+        lats=[body.lat],
+        lngs=[body.lng],
+        stream_gauge_heights=gauge_data["gauge_height_ft"],
+        gauge_change_rates=gauge_data["change_rate_ft_per_hr"],
         precip_prob_1hr=precip_data["precip_prob_1hr_pct"],
         precip_prob_6hr=precip_data["precip_prob_6hr_pct"],
         month=now.month,
-        hour=now.hour,
         flood_stage_ft=gauge_data["flood_stage_ft"],
     )
+    score   = float(batch["risk_score"][0])
+    in_zone = bool(batch["is_flood_zone"][0])
 
     sources = ["Rule-based risk scorer", "USGS Water Services"]
     nws_live   = precip_data["source"] == "NWS"
     usgs_live  = gauge_data.get("site_name", "") != "NJ gauge (fallback)"
     if nws_live:
         sources.append("National Weather Service")
-    if usgs_live and nws_live:
-        confidence = "High"
-    elif usgs_live or nws_live:
-        confidence = "Medium"
-    else:
-        confidence = "Low"
 
     return FloodRiskResponse(
         lat=body.lat,
         lng=body.lng,
-        risk_score=result["risk_score"],
-        risk_level=result["risk_level"],
+        risk_score=score,
+        risk_level=str(batch["risk_level"][0]),
         stream_gauge_height=gauge_data["gauge_height_ft"],
         precip_forecast_1hr=precip_data["precip_prob_1hr_pct"],
         precip_forecast_6hr=precip_data["precip_prob_6hr_pct"],
-        is_flood_zone=result["is_flood_zone"],
-        recommendation=result["recommendation"],
+        is_flood_zone=in_zone,
+        recommendation=recommendation(score, in_zone),
         data_sources=sources,
-        confidence=confidence,
+        confidence=confidence(usgs_live, nws_live),
+    )
+
+
+def _parse_floats(raw: str, n: int, name: str) -> list[float]:
+    try:
+        values = [float(v) for v in raw.split(",")]
+    except ValueError:
+        values = []
+    if len(values) != n:
+        raise HTTPException(status_code=422, detail=f"Malformed {name}: {raw!r}")
+    return values
+
+
+@router.get("/risk/stream")
+async def stream_flood_risk(
+    bbox: Optional[str] = Query(None, description="south,west,north,east"),
+    points: Optional[str] = Query(None, description="lat,lng;lat,lng;..."),
+):
+    """
+    Server-Sent Events stream of risk changes for a bounding box or a point
+    set, read from the precomputed statewide risk grid. An event is pushed
+    on connect and then only when the subscribed area's risk actually
+    changes:
+      points → {"levels": [...]} per point (null outside NJ)
+      bbox   → {"max_level": ..., "counts": {level: cells}}
+    """
+    if not settings.RISK_GRID_ENABLED:
+        raise HTTPException(status_code=503, detail="Risk grid is disabled")
+    if (bbox is None) == (points is None):
+        raise HTTPException(status_code=422, detail="Pass exactly one of bbox or points")
+    if risk_hub.subscribers >= settings.RISK_STREAM_MAX_SUBSCRIBERS:
+        raise HTTPException(status_code=503, detail="Too many live subscriptions")
+
+    if points is not None:
+        pairs = [_parse_floats(p, 2, "points") for p in points.split(";") if p]
+        if not pairs or len(pairs) > settings.RISK_STREAM_MAX_POINTS:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Between 1 and {settings.RISK_STREAM_MAX_POINTS} points per subscription",
+            )
+        lats, lngs = [p[0] for p in pairs], [p[1] for p in pairs]
+
+        def state():
+            if not risk_grid.ready:
+                return None
+            codes = risk_grid.level_codes_at(lats, lngs)
+            levels = [LEVEL_NAMES[c] if c >= 0 else None for c in codes.tolist()]
+            return risk_grid.etag, {"levels": levels}
+    else:
+        south, west, north, east = _parse_floats(bbox, 4, "bbox")
+        if south >= north or west >= east:
+            raise HTTPException(status_code=422, detail="bbox must be south,west,north,east")
+
+        def state():
+            if not risk_grid.ready:
+                return None
+            counts = risk_grid.level_counts_in(south, west, north, east).tolist()
+            present = [i for i, c in enumerate(counts) if c]
+            return risk_grid.etag, {
+                "max_level": LEVEL_NAMES[present[-1]] if present else None,
+                "counts": dict(zip(LEVEL_NAMES, counts)),
+            }
+
+    return StreamingResponse(
+        subscription_stream(state),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/risk/batch", response_model=FloodRiskBatchResponse)
+async def get_flood_risk_batch(body: FloodRiskBatchRequest):
+    """
+    Assess flood risk for up to RISK_BATCH_MAX_POINTS points in one call.
+    Gauge sites and NWS grid cells are deduplicated across the batch, each
+    fetched once, and all points are scored in one vectorized pass.
+    """
+    if not body.points:
+        raise HTTPException(status_code=422, detail="points must not be empty")
+    if len(body.points) > settings.RISK_BATCH_MAX_POINTS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.RISK_BATCH_MAX_POINTS} points per batch",
+        )
+
+    batch = await assess_points(
+        [p.lat for p in body.points],
+        [p.lng for p in body.points],
+        datetime.utcnow().month,
+        grid_snap_deg=settings.ROUTE_NWS_SNAP_DEG,
+    )
+    return FloodRiskBatchResponse(
+        count=len(body.points),
+        risk_score=batch["risk_score"].tolist(),
+        risk_level=batch["risk_level"].tolist(),
+        is_flood_zone=batch["is_flood_zone"].tolist(),
+        gauge_index=batch["site_index"],
+        precip_forecast_1hr=[p["precip_prob_1hr_pct"] for p in batch["precip"]],
+        precip_forecast_6hr=[p["precip_prob_6hr_pct"] for p in batch["precip"]],
+        gauges=[
+            GaugeSummary(
+                site=site,
+                site_name=g["site_name"],
+                gauge_height_ft=g["gauge_height_ft"],
+                change_rate_ft_per_hr=g["change_rate_ft_per_hr"],
+                flood_stage_ft=g["flood_stage_ft"],
+            )
+            for site, g in zip(batch["sites"], batch["gauges"])
+        ],
+        unique_nws_cells=batch["unique_cells"],
+        confidence=confidence(batch["usgs_live"], batch["nws_live"]),
+    )
+
+
+@router.get("/gauges/{site}/history", response_model=GaugeHistoryResponse)
+async def get_gauge_history(
+    site: str,
+    hours: float = Query(24.0, gt=0, le=24 * 30),
+    rate_window_min: float = Query(15.0, gt=0),
+):
+    """
+    Recent gauge height readings for one USGS site, served from the
+    in-memory history buffer, plus the rise rate over `rate_window_min`.
+    """
+    info = NJ_GAUGE_SITES.get(site)
+    if info is None:
+        raise HTTPException(status_code=404, detail=f"Unknown gauge site: {site}")
+
+    buf = buffer_for(site)
+    last = buf.last_time
+    if last is None:
+        times, heights = [], []
+    else:
+        times, heights = buf.since(last - int(hours * 3600))
+
+    return GaugeHistoryResponse(
+        site=site,
+        site_name=info["name"],
+        action_stage_ft=info["action_ft"],
+        flood_stage_ft=info["flood_ft"],
+        times=[datetime.fromtimestamp(int(t), timezone.utc) for t in times],
+        heights_ft=[round(float(h), 2) for h in heights],
+        change_rate_ft_per_hr=round(buf.rate_ft_per_hr(rate_window_min * 60), 3),
+        rate_window_min=rate_window_min,
+    )
+
+
+@router.get("/tiles/{z}/{x}/{y}")
+async def get_risk_tile(
+    z: int,
+    x: int,
+    y: int,
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Web-Mercator map tile (256×256 palette PNG) of the precomputed statewide
+    risk grid. Transparent outside NJ; green / yellow / orange / red for
+    low / moderate / high / severe. Revalidate with If-None-Match.
+    """
+    if not 0 <= z <= settings.RISK_TILE_MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    if not risk_grid.ready:
+        raise HTTPException(
+            status_code=503,
+            detail="Risk grid not computed yet",
+            headers={"Retry-After": str(int(settings.RISK_GRID_CHECK_INTERVAL_S))},
+        )
+
+    etag = f'"{risk_grid.etag}-{z}-{x}-{y}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={int(settings.RISK_GRID_CHECK_INTERVAL_S)}",
+    }
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=risk_grid.render_tile(z, x, y), media_type="image/png", headers=headers)
+
+
+@router.get("/model", response_model=ModelStatusResponse)
+async def get_model_status():
+    """
+    Flood model registry: active and shadow versions, per-version scoring
+    latency, and shadow-vs-served score divergence.
+    """
+    return ModelStatusResponse(
+        **model_registry.status(),
+        risk_cache=risk_cache.stats() if settings.RISK_CACHE_ENABLED else None,
     )
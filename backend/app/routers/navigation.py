@@ -1,45 +1,96 @@
 import re
 import asyncio
-import httpx
 from fastapi import APIRouter, HTTPException, Query
 from datetime import datetime
 
-import math
+import numpy as np
 
 from app.schemas.navigation import (
     RouteRequest, RouteResponse, FloodWarning,
-    NavStep, RouteRiskPoint, AlternativeRoute,
+    NavStep, RouteRiskPoint, RouteRiskSegment, AlternativeRoute, LocalRouteResponse,
     SafeZoneRequest, SafeZoneResponse, SafeZoneResult,
 )
 from app.config import settings
-from app.services.flood_ml import flood_model
-from app.services.usgs_service import get_stream_gauge_data, closest_gauge
-from app.services.nws_service import get_precip_forecast
+from app.services.flood_ml import recommendation, risk_level_codes
+from app.services.polyline import decode_steps, resample, runs
+from app.services.response_cache import directions_cache, geocode_cache, reverse_geocode_cache
+from app.services.place_search import place_search
+from app.services.safe_places import CATEGORY_LABELS, refresh_near, safe_places
+from app.services.risk_batch import FetchCache, assess_points, confidence
+from app.services.road_graph import RouteNotFoundError, road_graph
+from app.services.executors import routing_executor
+from app.services.circuit_breaker import breaker, CircuitOpenError
+from app.services.http_client import get_client, GOOGLE
+from app.services.single_flight import SingleFlight
 
 router = APIRouter(prefix="/navigation", tags=["navigation"])
 
 DIRECTIONS_URL = "https://maps.googleapis.com/maps/api/directions/json"
 GEOCODE_URL    = "https://maps.googleapis.com/maps/api/geocode/json"
-PLACES_URL     = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
 
-# Safe place types searched in priority order
-SAFE_PLACE_TYPES = ["police", "hospital", "fire_station", "transit_station"]
-SAFE_PLACE_LABELS = {
-    "police":          "Police Station",
-    "hospital":        "Hospital",
-    "fire_station":    "Fire Station",
-    "transit_station": "Transit Station",
-}
+_inflight = SingleFlight()   # coalesces identical concurrent Google calls
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
 
 
 async def _geocode(address: str) -> tuple[float, float]:
-    async with httpx.AsyncClient(timeout=8.0) as client:
-        resp = await client.get(GEOCODE_URL, params={"address": address, "key": settings.GOOGLE_MAPS_API_KEY})
+    """
+    Geocode an address (cached per normalized address); concurrent lookups
+    of the same address share one call.
+    """
+    key = _normalize(address)
+    cached = await geocode_cache.get(key)
+    if cached is None:
+        cached = await _inflight.do(("geocode", key), _geocode_once, address)
+        geocode_cache.set(key, cached)
+    place_search.note_geocoded(cached[2] if len(cached) > 2 else "")
+    return cached[0], cached[1]
+
+
+async def _geocode_once(address: str) -> tuple[float, float, str]:
+    try:
+        async with breaker("google_geocode"):
+            resp = await get_client(GOOGLE).get(GEOCODE_URL, params={"address": address, "key": settings.GOOGLE_MAPS_API_KEY})
+            resp.raise_for_status()
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="Geocoding temporarily unavailable")
     data = resp.json()
     if data["status"] != "OK":
         raise HTTPException(status_code=400, detail=f"Could not geocode: {address}")
-    loc = data["results"][0]["geometry"]["location"]
-    return loc["lat"], loc["lng"]
+    result = data["results"][0]
+    loc = result["geometry"]["location"]
+    return loc["lat"], loc["lng"], result.get("formatted_address", "")
+
+
+async def _reverse_geocode(lat: float, lng: float) -> str | None:
+    """
+    Return the formatted address for a point, or None if unavailable.
+    Cached per ~11 m (4 decimal places); failures are not cached.
+    """
+    key = (round(lat, 4), round(lng, 4))
+    cached = await reverse_geocode_cache.get(key)
+    if cached is not None:
+        return cached
+    address = await _inflight.do(("reverse_geocode", key), _reverse_geocode_once, lat, lng)
+    if address is not None:
+        reverse_geocode_cache.set(key, address)
+    return address
+
+
+async def _reverse_geocode_once(lat: float, lng: float) -> str | None:
+    try:
+        async with breaker("google_geocode"):
+            resp = await get_client(GOOGLE).get(
+                GEOCODE_URL,
+                params={"latlng": f"{lat},{lng}", "key": settings.GOOGLE_MAPS_API_KEY},
+            )
+            resp.raise_for_status()
+        results = resp.json().get("results")
+    except Exception:
+        return None
+    return results[0]["formatted_address"] if results else None
 
 
 async def _get_directions(origin: str, destination: str, avoid: str | None = None) -> list[dict]:
@@ -47,7 +98,19 @@ async def _get_directions(origin: str, destination: str, avoid: str | None = Non
     Fetch route(s) from Google Directions API.
     Always requests alternatives=true so we get up to 3 options.
     Returns a list of route dicts (each has distance, duration, polyline, steps).
+    Cached per normalized (origin, destination, avoid) for
+    DIRECTIONS_CACHE_TTL_S; concurrent identical requests share one call.
     """
+    key = (_normalize(origin), _normalize(destination), avoid)
+    cached = await directions_cache.get(key)
+    if cached is not None:
+        return cached
+    routes = await _inflight.do(("directions", *key), _get_directions_once, origin, destination, avoid)
+    directions_cache.set(key, routes)
+    return routes
+
+
+async def _get_directions_once(origin: str, destination: str, avoid: str | None) -> list[dict]:
     params = {
         "origin": origin,
         "destination": destination,
@@ -57,8 +120,12 @@ async def _get_directions(origin: str, destination: str, avoid: str | None = Non
     if avoid:
         params["avoid"] = avoid
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get(DIRECTIONS_URL, params=params)
+    try:
+        async with breaker("google_directions"):
+            resp = await get_client(GOOGLE).get(DIRECTIONS_URL, params=params)
+            resp.raise_for_status()
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="Directions temporarily unavailable")
     data = resp.json()
 
     if data["status"] != "OK":
@@ -101,104 +168,98 @@ def _risk_label(score: float) -> str:
 
 async def _score_route(
     raw_steps: list,
+    overview: str | None,
     dest_lat: float,
     dest_lng: float,
     month: int,
     hour: int,
     nav_steps: list[NavStep],
-) -> tuple[list[RouteRiskPoint], list[FloodWarning], float]:
+    cache: FetchCache | None = None,
+) -> tuple[list[RouteRiskPoint], list[FloodWarning], float, str, list[RouteRiskSegment]]:
     """
-    Score EVERY step on a route using cached USGS + NWS data.
-
-    Caching strategy:
-      - USGS: keyed by gauge site ID  (NJ has only 8 gauges — many steps share one)
-      - NWS:  keyed by (lat rounded to 1dp, lng rounded to 1dp)
-                       (NWS grid cells are county-sized, nearby points share a forecast)
-
-    This means a 30-step route typically makes only 3-4 USGS calls
-    and 4-6 NWS calls, all fired in parallel.
+    Score a route along its whole path, not just at step starts.
+
+    The step polylines are decoded and resampled every ROUTE_SAMPLE_INTERVAL_M
+    (see services/polyline.py); those samples, every step start and the
+    destination are scored in one assess_points batch. Upstream data is
+    fetched once per unique gauge site / NWS grid cell, so even thousands
+    of samples make a handful of USGS and NWS lookups, all fired in
+    parallel, then one vectorized model pass. Routes scored with the same
+    `cache` share those lookups.
+
+    Each step's risk point sits at its worst sample; runs of samples with
+    the same risk level become the route's compact risk segments.
     """
-    # Build full list of (lat, lng, label) for every step + destination
-    points: list[tuple[float, float, str]] = [
-        (s["start_location"]["lat"], s["start_location"]["lng"], nav_steps[i].instruction)
-        for i, s in enumerate(raw_steps)
-    ]
-    points.append((dest_lat, dest_lng, "Destination"))
-
-    # Identify unique gauge sites and NWS grid cells
-    unique_gauges: dict[str, tuple[float, float]] = {}   # site_id → representative (lat, lng)
-    unique_nws: dict[tuple, tuple[float, float]] = {}    # (r_lat, r_lng) → representative (lat, lng)
-
-    for lat, lng, _ in points:
-        site = closest_gauge(lat, lng)
-        if site not in unique_gauges:
-            unique_gauges[site] = (lat, lng)
-        nws_key = (round(lat, 1), round(lng, 1))
-        if nws_key not in unique_nws:
-            unique_nws[nws_key] = (lat, lng)
-
-    # Fire all unique API calls in parallel
-    gauge_keys  = list(unique_gauges.keys())
-    nws_keys    = list(unique_nws.keys())
-    gauge_latlngs = [unique_gauges[k] for k in gauge_keys]
-    nws_latlngs   = [unique_nws[k]   for k in nws_keys]
-
-    all_results = await asyncio.gather(
-        *[get_stream_gauge_data(lat, lng) for lat, lng in gauge_latlngs],
-        *[get_precip_forecast(lat, lng)   for lat, lng in nws_latlngs],
-    )
+    coords, owner = decode_steps(raw_steps, overview)
+    samples, dist, seg = resample(coords, settings.ROUTE_SAMPLE_INTERVAL_M, settings.ROUTE_MAX_SAMPLES)
+    sample_step = owner[seg] if len(samples) else np.empty(0, dtype=np.intp)
+
+    # Points: step starts, then path samples, then the destination
+    n_steps = len(raw_steps)
+    starts = np.array(
+        [[s["start_location"]["lat"], s["start_location"]["lng"]] for s in raw_steps], dtype=np.float64
+    ).reshape(-1, 2)
+    lats = np.concatenate([starts[:, 0], samples[:, 0], [dest_lat]])
+    lngs = np.concatenate([starts[:, 1], samples[:, 1], [dest_lng]])
+    step_of = np.concatenate([np.arange(n_steps), sample_step, [n_steps]])
+
+    batch = await assess_points(lats.tolist(), lngs.tolist(), month, cache, settings.ROUTE_NWS_SNAP_DEG)
+    scores = batch["risk_score"]
+    levels = batch["risk_level"]
+
+    # Worst point per step (every step has at least its start point)
+    order = np.lexsort((-scores, step_of))
+    by_step = step_of[order]
+    worst = order[np.flatnonzero(np.concatenate(([True], by_step[1:] != by_step[:-1])))]
+    labels = [s.instruction for s in nav_steps] + ["Destination"]
 
-    gauge_cache = dict(zip(gauge_keys, all_results[:len(gauge_keys)]))
-    nws_cache   = dict(zip(nws_keys,   all_results[len(gauge_keys):]))
-
-    # Score every point using cached data
     risk_points: list[RouteRiskPoint] = []
     warnings:    list[FloodWarning]   = []
 
-    for lat, lng, label in points:
-        site    = closest_gauge(lat, lng)
-        nws_key = (round(lat, 1), round(lng, 1))
-        gauge   = gauge_cache[site]
-        precip  = nws_cache[nws_key]
-
-        result = flood_model.assess_location(
-            lat=lat,
-            lng=lng,
-            stream_gauge_height=gauge["gauge_height_ft"],
-            gauge_change_rate=gauge["change_rate_ft_per_hr"],
-            precip_prob_1hr=precip["precip_prob_1hr_pct"],
-            precip_prob_6hr=precip["precip_prob_6hr_pct"],
-            month=month,
-            hour=hour,
-            flood_stage_ft=gauge["flood_stage_ft"],
-        )
-
+    for i, label in zip(worst.tolist(), labels):
+        score = float(scores[i])
         risk_points.append(RouteRiskPoint(
-            lat=lat, lng=lng,
-            risk_score=result["risk_score"],
-            risk_level=result["risk_level"],
+            lat=float(lats[i]), lng=float(lngs[i]),
+            risk_score=score,
+            risk_level=str(levels[i]),
             label=label[:80],
         ))
 
-        if result["risk_score"] > 20:
+        if score > 20:
             warnings.append(FloodWarning(
                 location=label[:60],
-                risk_score=result["risk_score"],
-                message=result["recommendation"],
+                risk_score=score,
+                message=recommendation(score, bool(batch["is_flood_zone"][i])),
+            ))
+
+    # Path samples → runs of equal risk level
+    segments: list[RouteRiskSegment] = []
+    path_scores = scores[n_steps:n_steps + len(samples)]
+    run_start, run_end = runs(risk_level_codes(path_scores))
+    if len(run_start):
+        run_worst = np.maximum.reduceat(path_scores, run_start)
+        for a, b, worst_score in zip(run_start.tolist(), run_end.tolist(), run_worst.tolist()):
+            last = min(b, len(samples) - 1)
+            segments.append(RouteRiskSegment(
+                start_m=round(float(dist[a]), 1),
+                end_m=round(float(dist[last]), 1),
+                risk_level=str(levels[n_steps + a]),
+                risk_score=worst_score,
+                start_lat=float(samples[a, 0]), start_lng=float(samples[a, 1]),
+                end_lat=float(samples[last, 0]), end_lng=float(samples[last, 1]),
             ))
 
-    overall_risk = max(p.risk_score for p in risk_points) if risk_points else 0.0
+    overall_risk = float(scores.max()) if len(scores) else 0.0
+    return risk_points, warnings, overall_risk, confidence(batch["usgs_live"], batch["nws_live"]), segments
 
-    usgs_live = any(v.get("site_name", "") != "NJ gauge (fallback)" for v in gauge_cache.values())
-    nws_live  = any(v.get("source") == "NWS" for v in nws_cache.values())
-    if usgs_live and nws_live:
-        confidence = "High"
-    elif usgs_live or nws_live:
-        confidence = "Medium"
-    else:
-        confidence = "Low"
 
-    return risk_points, warnings, overall_risk, confidence
+def _discard(tasks: list[asyncio.Task]) -> None:
+    """Cancel unfinished tasks and retrieve finished ones' errors (no 'never retrieved' warnings)."""
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()
 
 
 @router.post("/route", response_model=RouteResponse)
@@ -206,7 +267,7 @@ async def get_safe_route(body: RouteRequest):
     """
     Flood-aware routing:
     1. Fetches primary route + up to 2 Google alternatives simultaneously
-    2. Checks flood risk at EVERY step on the primary route
+    2. Checks flood risk along the whole primary route (densely resampled)
     3. If primary risk >= High (41), scores alternatives and returns the safest one
     4. overall_risk = worst single point on the path (not just start/end)
     """
@@ -225,55 +286,76 @@ async def get_safe_route(body: RouteRequest):
     # All candidate routes: primary alternatives + avoid-highways alternatives
     all_candidates = primary_routes + avoid_routes
 
-    # Score the primary route (first result from Google — their best suggestion)
+    # Primary route = first result from Google (their best suggestion);
+    # distinct candidates are every other polyline
     primary = primary_routes[0]
+    candidates = list({
+        c["polyline"]: c for c in all_candidates[1:] if c["polyline"] != primary["polyline"]
+    }.values())
+
+    # Score the primary and (speculatively) every candidate concurrently, all
+    # sharing one request-scoped cache of gauge / grid / forecast lookups
+    cache = FetchCache()
     primary_nav = _parse_nav_steps(primary["raw_steps"])
-    primary_risk_pts, primary_warnings, primary_overall, primary_confidence = await _score_route(
-        primary["raw_steps"], dest_lat, dest_lng, now.month, now.hour, primary_nav
-    )
+    cand_navs   = [_parse_nav_steps(c["raw_steps"]) for c in candidates]
+    cand_tasks: list[asyncio.Task] = [
+        asyncio.create_task(_score_route(c["raw_steps"], c["polyline"], dest_lat, dest_lng, now.month, now.hour, nav, cache))
+        for c, nav in zip(candidates, cand_navs)
+    ] if settings.ROUTE_SPECULATIVE_SCORING else []
+    try:
+        primary_risk_pts, primary_warnings, primary_overall, primary_confidence, primary_segments = await _score_route(
+            primary["raw_steps"], primary["polyline"], dest_lat, dest_lng, now.month, now.hour, primary_nav, cache
+        )
 
-    # Only suggest an alternative when primary risk is High or Severe (>= 60/80).
-    # The alternative must genuinely score lower — no alternative shown if all
-    # routes score the same (e.g. all cross the same flooded basin).
-    alternative_route = None
-    if primary_overall >= 60 and len(all_candidates) > 1:
-        def _alt_score_key(result_tuple):
-            pts, _, overall = result_tuple
-            high_count = sum(1 for p in pts if p.risk_score > 40)
-            return (high_count, overall)
-
-        primary_key  = _alt_score_key((primary_risk_pts, primary_warnings, primary_overall))
-        best_alt     = None
-        best_alt_nav = None
-        best_alt_pts = None
-        best_alt_overall = primary_overall
-        best_key     = primary_key
-
-        for candidate in all_candidates[1:]:
-            if candidate["polyline"] == primary["polyline"]:
-                continue
-            cand_nav = _parse_nav_steps(candidate["raw_steps"])
-            cand_pts, _, cand_overall, _ = await _score_route(
-                candidate["raw_steps"], dest_lat, dest_lng, now.month, now.hour, cand_nav
-            )
-            cand_key = _alt_score_key((cand_pts, None, cand_overall))
-            if cand_key < best_key:
-                best_key         = cand_key
-                best_alt         = candidate
-                best_alt_nav     = cand_nav
-                best_alt_pts     = cand_pts
-                best_alt_overall = cand_overall
-
-        if best_alt:
-            alternative_route = AlternativeRoute(
-                distance=best_alt["distance"],
-                duration=best_alt["duration"],
-                polyline=best_alt["polyline"],
-                overall_risk=best_alt_overall,
-                risk_level=_risk_label(best_alt_overall),
-                steps=best_alt_nav,
-                route_risk_points=best_alt_pts,
-            )
+        # Only suggest an alternative when primary risk is High or Severe (>= 60/80).
+        # The alternative must genuinely score lower — no alternative shown if all
+        # routes score the same (e.g. all cross the same flooded basin).
+        alternative_route = None
+        if primary_overall >= 60 and candidates:
+            def _alt_score_key(result_tuple):
+                pts, _, overall = result_tuple
+                high_count = sum(1 for p in pts if p.risk_score > 40)
+                return (high_count, overall)
+
+            if not cand_tasks:
+                cand_tasks += [
+                    asyncio.create_task(_score_route(c["raw_steps"], c["polyline"], dest_lat, dest_lng, now.month, now.hour, nav, cache))
+                    for c, nav in zip(candidates, cand_navs)
+                ]
+            cand_results = await asyncio.gather(*cand_tasks)
+
+            primary_key  = _alt_score_key((primary_risk_pts, primary_warnings, primary_overall))
+            best_alt     = None
+            best_alt_nav = None
+            best_alt_pts = None
+            best_alt_segs = None
+            best_alt_overall = primary_overall
+            best_key     = primary_key
+
+            for candidate, cand_nav, (cand_pts, _, cand_overall, _, cand_segs) in zip(candidates, cand_navs, cand_results):
+                cand_key = _alt_score_key((cand_pts, None, cand_overall))
+                if cand_key < best_key:
+                    best_key         = cand_key
+                    best_alt         = candidate
+                    best_alt_nav     = cand_nav
+                    best_alt_pts     = cand_pts
+                    best_alt_segs    = cand_segs
+                    best_alt_overall = cand_overall
+
+            if best_alt:
+                alternative_route = AlternativeRoute(
+                    distance=best_alt["distance"],
+                    duration=best_alt["duration"],
+                    polyline=best_alt["polyline"],
+                    overall_risk=best_alt_overall,
+                    risk_level=_risk_label(best_alt_overall),
+                    steps=best_alt_nav,
+                    route_risk_points=best_alt_pts,
+                    risk_segments=best_alt_segs,
+                )
+    finally:
+        # Speculative or unused candidate scoring must not outlive the request
+        _discard(cand_tasks)
 
     return RouteResponse(
         origin=body.origin,
@@ -286,46 +368,66 @@ async def get_safe_route(body: RouteRequest):
         alternative_route=alternative_route,
         steps=primary_nav,
         route_risk_points=primary_risk_pts,
+        risk_segments=primary_segments,
         confidence=primary_confidence,
     )
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# SafeZone endpoint
+# Offline routing endpoint
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-    """Return great-circle distance in km between two lat/lng points."""
-    R = 6371.0
-    dlat = math.radians(lat2 - lat1)
-    dlng = math.radians(lng2 - lng1)
-    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
-    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+async def _resolve_point(location: str) -> tuple[float, float]:
+    """'lat,lng' as-is (no network); anything else through the geocode cache."""
+    match = _LATLNG_RE.match(location.strip())
+    if match:
+        return float(match.group(1)), float(match.group(2))
+    if not settings.GOOGLE_MAPS_API_KEY:
+        raise HTTPException(status_code=400, detail="Give locations as 'lat,lng' — geocoding is not configured")
+    return await _geocode(location)
 
 
-async def _search_places(lat: float, lng: float, place_type: str) -> list[dict]:
-    """Search Google Places Nearby for a given type within 10 km."""
-    params = {
-        "location": f"{lat},{lng}",
-        "radius":   10000,           # 10 km
-        "type":     place_type,
-        "key":      settings.GOOGLE_MAPS_API_KEY,
-    }
+@router.post("/route/local", response_model=LocalRouteResponse)
+async def get_local_route(body: RouteRequest):
+    """
+    Flood-aware routing on the local road graph (see road_graph.py):
+    no Directions call, and the route itself steers around risky roads
+    instead of picking among Google's alternatives. Fully offline when
+    origin and destination are 'lat,lng' or already geocoded.
+    """
+    if not road_graph.configured:
+        raise HTTPException(status_code=503, detail="Local road graph not configured")
+
+    origin, destination = await asyncio.gather(
+        _resolve_point(body.origin), _resolve_point(body.destination),
+    )
     try:
-        async with httpx.AsyncClient(timeout=8.0) as client:
-            resp = await client.get(PLACES_URL, params=params)
-        data = resp.json()
-        return data.get("results", [])
-    except Exception:
-        return []
+        result = await routing_executor.run(road_graph.route, origin, destination, body.avoid_flood)
+    except RouteNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
+    return LocalRouteResponse(origin=body.origin, destination=body.destination, **result)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SafeZone endpoint
+# ─────────────────────────────────────────────────────────────────────────────
 
 _LATLNG_RE = re.compile(r"^(-?\d+\.?\d*),\s*(-?\d+\.?\d*)$")
 
 
 @router.get("/autocomplete")
 async def autocomplete_location(input: str = Query(..., min_length=2)):
-    """Proxy Google Places Autocomplete — returns up to 5 address suggestions."""
+    """
+    Up to 5 address suggestions. Served from the local prefix index (towns,
+    landmarks, safe places, previously resolved addresses) and cached per
+    prefix; only a local miss is proxied to Google Places Autocomplete.
+    """
+    suggestions = place_search.cached(input)
+    if suggestions is None:
+        suggestions = place_search.suggest(input) or None
+    if suggestions is not None:
+        return [{"description": d} for d in suggestions]
     if not settings.GOOGLE_MAPS_API_KEY:
         return []
     params = {
@@ -335,66 +437,51 @@ async def autocomplete_location(input: str = Query(..., min_length=2)):
         "key":        settings.GOOGLE_MAPS_API_KEY,
     }
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.get(
+        async with breaker("google_places"):
+            resp = await get_client(GOOGLE).get(
                 "https://maps.googleapis.com/maps/api/place/autocomplete/json",
                 params=params,
             )
-        predictions = resp.json().get("predictions", [])
-        return [{"description": p["description"]} for p in predictions[:5]]
+            resp.raise_for_status()
+        suggestions = [p["description"] for p in resp.json().get("predictions", [])[:5]]
+        place_search.remember(input, suggestions)
+        return [{"description": d} for d in suggestions]
     except Exception:
         return []
 
 
-async def _search_places_keyword(lat: float, lng: float, keyword: str) -> list[dict]:
-    """Search Google Places Nearby using a keyword (e.g. 'emergency shelter')."""
-    params = {
-        "location": f"{lat},{lng}",
-        "radius":   20000,
-        "keyword":  keyword,
-        "key":      settings.GOOGLE_MAPS_API_KEY,
-    }
-    try:
-        async with httpx.AsyncClient(timeout=8.0) as client:
-            resp = await client.get(PLACES_URL, params=params)
-        return resp.json().get("results", [])
-    except Exception:
-        return []
-
+async def _nearest_of_type(lat: float, lng: float, category: str) -> dict | None:
+    """
+    Closest indexed place of a category within SAFE_PLACES_MAX_KM, or None.
 
-async def _nearest_of_type(
-    lat: float, lng: float, place_type: str | None, keyword: str | None, label: str
-) -> dict | None:
-    """Return the closest candidate of a given Places type or keyword, or None."""
-    if keyword:
-        places = await _search_places_keyword(lat, lng, keyword)
-    else:
-        places = await _search_places(lat, lng, place_type)
-
-    best = None
-    for p in places:
-        loc = p.get("geometry", {}).get("location", {})
-        plat, plng = loc.get("lat"), loc.get("lng")
-        if plat is None or plng is None:
-            continue
-        dist = _haversine_km(lat, lng, plat, plng)
-        if best is None or dist < best["distance_km"]:
-            best = {
-                "place_name":  p.get("name", "Unknown"),
-                "place_type":  label,
-                "lat":         plat,
-                "lng":         plng,
-                "distance_km": dist,
-                "vicinity":    p.get("vicinity", ""),
-            }
-    return best
+    Answered from the local index; only when nothing of the category is
+    indexed within range is Google Places asked once, and its results are
+    upserted so the next lookup nearby stays local.
+    """
+    max_km = settings.SAFE_PLACES_MAX_KM
+    found = safe_places.nearest(lat, lng, category, max_km=max_km)
+    if not found and settings.GOOGLE_MAPS_API_KEY:
+        await refresh_near(lat, lng, category, radius_m=int(max_km * 1000))
+        found = safe_places.nearest(lat, lng, category, max_km=max_km)
+    if not found:
+        return None
+    place = found[0]
+    return {
+        "place_name":  place["name"],
+        "place_type":  CATEGORY_LABELS[category],
+        "lat":         place["lat"],
+        "lng":         place["lng"],
+        "distance_km": place["distance_km"],
+        "vicinity":    place["vicinity"],
+    }
 
 
 @router.post("/safezone", response_model=SafeZoneResponse)
 async def get_safezone(body: SafeZoneRequest):
     """
     Accept a free-text location, geocode it, then find the nearest hospital
-    and emergency shelter and return driving directions to each.
+    and emergency shelter (from the local safe-place index) and return
+    driving directions to each.
     """
     if not settings.GOOGLE_MAPS_API_KEY:
         raise HTTPException(status_code=503, detail="Google Maps API key not configured")
@@ -407,31 +494,26 @@ async def get_safezone(body: SafeZoneRequest):
     else:
         try:
             user_lat, user_lng = await _geocode(body.location)
-        except HTTPException:
+        except HTTPException as e:
+            if e.status_code == 503:
+                raise
             raise HTTPException(status_code=400, detail=f"Could not find location: {body.location}")
 
     # Resolve a display address for the geocoded point
-    async with httpx.AsyncClient(timeout=8.0) as hclient:
-        rev = await hclient.get(
-            "https://maps.googleapis.com/maps/api/geocode/json",
-            params={"latlng": f"{user_lat},{user_lng}", "key": settings.GOOGLE_MAPS_API_KEY},
-        )
-    rev_data = rev.json()
-    display_addr = (
-        rev_data["results"][0]["formatted_address"]
-        if rev_data.get("results")
-        else body.location
-    )
+    display_addr = await _reverse_geocode(user_lat, user_lng) or body.location
 
     # Search hospital and shelter in parallel
     hospital_cand, shelter_cand = await asyncio.gather(
-        _nearest_of_type(user_lat, user_lng, "hospital", None, "Hospital"),
-        _nearest_of_type(user_lat, user_lng, None, "emergency shelter", "Emergency Shelter"),
+        _nearest_of_type(user_lat, user_lng, "hospital"),
+        _nearest_of_type(user_lat, user_lng, "shelter"),
     )
 
     candidates = [c for c in [hospital_cand, shelter_cand] if c is not None]
     if not candidates:
-        raise HTTPException(status_code=404, detail="No hospitals or shelters found within 20 km")
+        raise HTTPException(
+            status_code=404,
+            detail=f"No hospitals or shelters found within {settings.SAFE_PLACES_MAX_KM:g} km",
+        )
 
     # Get driving directions for each candidate in parallel
     origin_str = f"{user_lat},{user_lng}"
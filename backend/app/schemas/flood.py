@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from datetime import datetime
 from typing import Optional
 
 
@@ -19,3 +20,68 @@ class FloodRiskResponse(BaseModel):
     recommendation: str
     data_sources: list[str]
     confidence: str            # High | Medium | Low
+
+
+class FloodRiskBatchRequest(BaseModel):
+    points: list[FloodRiskRequest]
+
+
+class GaugeSummary(BaseModel):
+    site: Optional[str] = None      # None when no gauge had data (fallback defaults)
+    site_name: str
+    gauge_height_ft: float
+    change_rate_ft_per_hr: float
+    flood_stage_ft: float
+
+
+class FloodRiskBatchResponse(BaseModel):
+    """Columnar: every per-point list is aligned with the request's points."""
+    count: int
+    risk_score: list[float]
+    risk_level: list[str]
+    is_flood_zone: list[bool]
+    gauge_index: list[int]          # index into gauges
+    precip_forecast_1hr: list[float]
+    precip_forecast_6hr: list[float]
+    gauges: list[GaugeSummary]      # one per unique nearest gauge
+    unique_nws_cells: int
+    confidence: str                 # High | Medium | Low
+
+
+class GaugeHistoryResponse(BaseModel):
+    site: str
+    site_name: str
+    action_stage_ft: float
+    flood_stage_ft: float
+    times: list[datetime]      # UTC, oldest first
+    heights_ft: list[float]    # parallel to times
+    change_rate_ft_per_hr: float
+    rate_window_min: float
+
+
+class ModelVersionStats(BaseModel):
+    version: str
+    calls: int
+    points: int
+    latency_ms_p50: float
+    latency_ms_p95: float
+    latency_ms_p99: float
+
+
+class ShadowDivergence(BaseModel):
+    version: str
+    batches: int
+    points: int
+    dropped: int               # samples skipped because the shadow queue was full
+    mean_abs_diff: float       # vs. the score actually served
+    max_abs_diff: float
+    level_change_rate: float   # fraction of points whose risk level would differ
+
+
+class ModelStatusResponse(BaseModel):
+    active: Optional[str] = None          # None → rule-based scorer
+    shadow: Optional[str] = None
+    shadow_sample_rate: float
+    versions: list[ModelVersionStats]
+    divergence: list[ShadowDivergence]
+    risk_cache: Optional[dict] = None     # present when RISK_CACHE_ENABLED
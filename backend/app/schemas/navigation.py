@@ -31,6 +31,18 @@ class RouteRiskPoint(BaseModel):
     label: str   # e.g. "Step 3: Turn left onto Main St"
 
 
+class RouteRiskSegment(BaseModel):
+    """A stretch of the route (by distance along it) with one risk level."""
+    start_m: float
+    end_m: float
+    risk_level: str
+    risk_score: Optional[float] = None   # worst sample in the stretch; None when only levels are known
+    start_lat: float
+    start_lng: float
+    end_lat: float
+    end_lng: float
+
+
 class AlternativeRoute(BaseModel):
     distance: str
     duration: str
@@ -39,6 +51,20 @@ class AlternativeRoute(BaseModel):
     risk_level: str
     steps: list[NavStep] = []
     route_risk_points: list[RouteRiskPoint] = []
+    risk_segments: list[RouteRiskSegment] = []
+
+
+class LocalRouteResponse(BaseModel):
+    origin: str
+    destination: str
+    distance_m: float
+    duration_s: float
+    polyline: str
+    risk_level: str                         # worst level along the route
+    risk_segments: list[RouteRiskSegment] = []
+    risk_aware: bool                        # False until the statewide risk grid is ready
+    nodes_explored: int
+    compute_ms: float
 
 
 class SafeZoneRequest(BaseModel):
@@ -71,4 +97,5 @@ class RouteResponse(BaseModel):
     alternative_route: Optional[AlternativeRoute] = None
     steps: list[NavStep] = []
     route_risk_points: list[RouteRiskPoint] = []
+    risk_segments: list[RouteRiskSegment] = []
     confidence: str = "Medium"  # High | Medium | Low — based on live data sources used
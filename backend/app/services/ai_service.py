@@ -7,6 +7,7 @@ import asyncio
 from google import genai
 from google.genai import types
 from app.config import settings
+from app.services.circuit_breaker import UpstreamUnavailableError, breaker
 
 client = genai.Client(api_key=settings.GEMINI_API_KEY) if settings.GEMINI_API_KEY else None
 
@@ -17,6 +18,12 @@ MODELS = [
     "gemini-2.0-flash-lite",
 ]
 
+FALLBACK_REPLY = (
+    "I'm having trouble connecting right now. "
+    "If you see water on the road, do NOT drive through it. "
+    "Turn around and find an alternate route. Stay safe."
+)
+
 SYSTEM_PROMPT = """You are WaterWise AI, an emergency flood safety assistant for New Jersey drivers.
 Your job is to help users navigate safely during flood events.
 
@@ -81,6 +88,16 @@ async def get_ai_response(
             "AI assistant is not configured. Please set GEMINI_API_KEY in your .env file."
         )
 
+    # Fails fast with the fallback reply while Gemini's circuit is open
+    try:
+        async with breaker("gemini"):
+            return await _first_model_reply(contents, config)
+    except Exception:
+        return FALLBACK_REPLY
+
+
+async def _first_model_reply(contents, config) -> str:
+    """Try each model in order; raise if none of them answers."""
     last_error = None
     for model in MODELS:
         try:
@@ -95,8 +112,4 @@ async def get_ai_response(
             last_error = str(e)
 
     print(f"[Gemini] All models failed. Last error: {last_error}")
-    return (
-        "I'm having trouble connecting right now. "
-        "If you see water on the road, do NOT drive through it. "
-        "Turn around and find an alternate route. Stay safe."
-    )
+    raise UpstreamUnavailableError(f"all Gemini models failed: {last_error}")
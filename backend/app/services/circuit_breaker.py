@@ -0,0 +1,135 @@
+"""
+Per-upstream circuit breakers.
+
+When an upstream (USGS, NWS, Google, Gemini) is down, every caller would
+otherwise wait out the full HTTP timeout before falling back. A breaker
+counts consecutive upstream failures (5xx responses, timeouts, transport
+errors — a 4xx is the caller's fault and counts as a success); after CIRCUIT_FAILURE_THRESHOLD it opens and
+callers fail fast with CircuitOpenError (services turn that into their
+usual fallback). After CIRCUIT_RESET_TIMEOUT_S one probe call is let
+through (half-open): success closes the circuit, failure re-opens it.
+
+Usage:
+    async with breaker("usgs"):
+        resp = await client.get(...)
+        resp.raise_for_status()
+
+States are reported on /health via breaker_states().
+"""
+
+import asyncio
+import time
+
+import httpx
+
+from app.config import settings
+
+# Upstreams with a breaker (shown on /health even before first use)
+UPSTREAMS = ("usgs", "nws", "google_directions", "google_geocode", "google_places", "gemini")
+
+CLOSED    = "closed"
+OPEN      = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+    def __init__(self, name: str):
+        super().__init__(f"circuit '{name}' is open")
+        self.name = name
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised by non-HTTP clients (e.g. the Gemini SDK) when the upstream itself failed."""
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """Whether an exception means the upstream is unhealthy (vs. a bad request)."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError, UpstreamUnavailableError))
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_timeout_s: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.short_circuited = 0       # calls rejected while open
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now. Must be followed by record_*()."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout_s:
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            print(f"[Circuit] {self.name} closed")
+        self.state = CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                print(f"[Circuit] {self.name} open after {self.failures} failure(s)")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    async def __aenter__(self):
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.record_success()
+        elif isinstance(exc, Exception):
+            if is_upstream_failure(exc):
+                self.record_failure()
+            else:
+                self.record_success()     # the upstream answered; the request was bad
+        else:
+            self._probe_in_flight = False   # cancelled — not the upstream's fault
+        return False
+
+    def snapshot(self) -> dict:
+        return {
+            "state":           self.state,
+            "failures":        self.failures,
+            "short_circuited": self.short_circuited,
+        }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def breaker(name: str) -> CircuitBreaker:
+    """Return the named upstream's breaker, creating it on first use."""
+    cb = _breakers.get(name)
+    if cb is None:
+        cb = _breakers[name] = CircuitBreaker(
+            name, settings.CIRCUIT_FAILURE_THRESHOLD, settings.CIRCUIT_RESET_TIMEOUT_S,
+        )
+    return cb
+
+
+def breaker_states() -> dict[str, dict]:
+    for name in UPSTREAMS:
+        breaker(name)
+    return {name: cb.snapshot() for name, cb in _breakers.items()}
@@ -0,0 +1,136 @@
+"""
+Bounded executors for CPU-bound work that must not run on the event loop.
+
+Each executor is a named pool with a fixed number of workers and a bounded
+backlog. run() hands a call to the pool and awaits it; once
+max_workers + max_queue calls are in flight, further calls fail fast with
+ExecutorBusyError (→ 503 with Retry-After, see main.py) instead of piling
+up behind a burst. A login storm therefore saturates only the auth pool:
+route scoring keeps its own workers, and the event loop stays free.
+
+Pools:
+  inference — flood-model scoring (numpy; threads)
+  auth      — bcrypt hash / verify (releases the GIL; threads)
+  routing   — local A* over the road graph (road_graph.py; threads)
+
+Metrics per pool: active / queued right now, peak queue depth, completed
+and rejected counts, mean queue wait and run time. Exposed on /health.
+"""
+
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.config import settings
+
+
+class ExecutorBusyError(Exception):
+    """The pool's backlog is full; retry later."""
+
+    def __init__(self, name: str):
+        super().__init__(f"{name} executor is saturated")
+        self.name = name
+
+
+def _timed(fn: Callable, submitted: float) -> tuple[Any, float, float]:
+    """Runs in the worker: returns (result, queue wait s, run time s)."""
+    started = time.monotonic()
+    result = fn()
+    return result, started - submitted, time.monotonic() - started
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, max_workers: int, max_queue: int, kind: str = "thread"):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self._pool: Executor | None = None
+
+        self.in_flight = 0
+        self.peak_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_s = 0.0
+        self._run_s = 0.0
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._pool
+
+    @property
+    def active(self) -> int:
+        return min(self.in_flight, self.max_workers)
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.in_flight - self.max_workers)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool; raises ExecutorBusyError when full."""
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorBusyError(self.name)
+
+        self.in_flight += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        try:
+            call = functools.partial(fn, *args, **kwargs)
+            result, wait_s, run_s = await asyncio.get_running_loop().run_in_executor(
+                self._get_pool(), _timed, call, time.monotonic()
+            )
+        finally:
+            self.in_flight -= 1
+
+        self.completed += 1
+        self._wait_s += wait_s
+        self._run_s += run_s
+        return result
+
+    def stats(self) -> dict:
+        done = self.completed or 1
+        return {
+            "workers":        self.max_workers,
+            "max_queue":      self.max_queue,
+            "active":         self.active,
+            "queued":         self.queued,
+            "peak_queued":    self.peak_queued,
+            "completed":      self.completed,
+            "rejected":       self.rejected,
+            "mean_wait_ms":   round(self._wait_s / done * 1000, 3),
+            "mean_run_ms":    round(self._run_s / done * 1000, 3),
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+inference_executor = BoundedExecutor(
+    "inference", settings.EXECUTOR_INFERENCE_WORKERS, settings.EXECUTOR_INFERENCE_QUEUE,
+)
+auth_executor = BoundedExecutor(
+    "auth", settings.EXECUTOR_AUTH_WORKERS, settings.EXECUTOR_AUTH_QUEUE,
+)
+
+routing_executor = BoundedExecutor(
+    "routing", settings.EXECUTOR_ROUTING_WORKERS, settings.EXECUTOR_ROUTING_QUEUE,
+)
+
+_EXECUTORS = (inference_executor, auth_executor, routing_executor)
+
+
+def executor_stats() -> dict:
+    return {e.name: e.stats() for e in _EXECUTORS}
+
+
+def shutdown_executors() -> None:
+    for e in _EXECUTORS:
+        e.shutdown()
@@ -2,6 +2,15 @@
 waterWise Flood Risk ML Model — GradientBoostingRegressor.
 
 Trained on synthetic NJ flood data. Outputs a risk score (0–80).
+The fitted ensemble is exported to flat numpy arrays and served by the
+sklearn-free TreeEnsemble evaluator; sklearn is only imported to train.
+
+Nothing is trained or loaded on import. Artifacts are built offline into
+the versioned store (see model_store.py); the model registry (see
+model_registry.py) maps the active version in at startup and hot-swaps
+new ones. Until one lands — or if no artifact exists — points are scored
+by rule_scores(), the deterministic domain rules the training labels are
+generated from.
 
 Features:
   - gauge_height_ratio  : gauge height / flood stage (unitless)
@@ -18,39 +27,16 @@ Risk levels (0–80 scale):
   61–80  → severe
 """
 
-import os
 import numpy as np
-import joblib
-from sklearn.ensemble import GradientBoostingRegressor
-from sklearn.preprocessing import StandardScaler
 
-# Paths relative to this file
-_DIR = os.path.dirname(os.path.abspath(__file__))
-_MODEL_PATH = os.path.join(_DIR, "../../../flood_model.joblib")
-_SCALER_PATH = os.path.join(_DIR, "../../../flood_scaler.joblib")
+from app.config import settings
+from app.services.flood_zones import is_flood_zone, is_flood_zone_many  # noqa: F401 — re-exported
+from app.services.model_registry import ModelRegistry
+from app.services.risk_cache import risk_cache
 
 # NJ high-risk months: spring snowmelt + hurricane season
 HIGH_RISK_MONTHS = {3, 4, 5, 8, 9, 10, 11}
 
-# Known NJ FEMA high-risk flood zone bounding boxes
-NJ_FLOOD_ZONES = [
-    (40.60, 40.85, -74.25, -74.00, "Newark/Passaic River basin"),
-    (40.10, 40.35, -74.10, -73.90, "Raritan River basin"),
-    (39.90, 40.10, -74.30, -74.10, "Toms River area"),
-    (40.45, 40.65, -74.55, -74.30, "Bound Brook / Somerset"),
-    (40.85, 41.05, -74.20, -74.00, "Pompton Lakes / Wayne"),
-    (39.35, 39.55, -74.65, -74.40, "Atlantic City coastal"),
-    (40.70, 40.90, -74.10, -73.95, "Hackensack River"),
-    (40.30, 40.50, -74.50, -74.25, "Millstone River"),
-]
-
-
-def is_flood_zone(lat: float, lng: float) -> bool:
-    for lat_min, lat_max, lng_min, lng_max, _ in NJ_FLOOD_ZONES:
-        if lat_min <= lat <= lat_max and lng_min <= lng <= lng_max:
-            return True
-    return False
-
 
 def _risk_level(score: float) -> str:
     if score <= 20:
@@ -62,7 +48,22 @@ def _risk_level(score: float) -> str:
     return "severe"
 
 
-def _recommendation(score: float, in_zone: bool) -> str:
+LEVEL_NAMES = ("low", "moderate", "high", "severe")
+_LEVELS = np.array(LEVEL_NAMES)
+_LEVEL_BOUNDS = np.array([20, 40, 60])
+
+
+def risk_level_codes(scores: np.ndarray) -> np.ndarray:
+    """Level index per score: 0 low, 1 moderate, 2 high, 3 severe."""
+    return np.searchsorted(_LEVEL_BOUNDS, scores, side="left")
+
+
+def risk_levels(scores: np.ndarray) -> np.ndarray:
+    """Vectorized _risk_level: array of level names for an array of scores."""
+    return _LEVELS[risk_level_codes(scores)]
+
+
+def recommendation(score: float, in_zone: bool) -> str:
     level = _risk_level(score)
     zone_note = " This area is a known NJ FEMA flood zone." if in_zone else ""
     if level == "low":
@@ -74,19 +75,14 @@ def _recommendation(score: float, in_zone: bool) -> str:
     return f"Score {score}/80 — SEVERE flood risk!{zone_note} Do NOT proceed. Turn Around, Don't Drown."
 
 
-def _generate_training_data(n: int = 3000):
-    """Generate synthetic NJ flood training samples."""
-    rng = np.random.default_rng(42)
-
-    gauge_ratio    = rng.uniform(0.0, 1.6, n)       # height / flood_stage
-    gauge_rate     = rng.uniform(-0.2, 2.0, n)       # ft/hr
-    precip_1hr     = rng.uniform(0, 100, n)          # %
-    precip_6hr     = rng.uniform(0, 100, n)          # %
-    in_zone        = rng.integers(0, 2, n).astype(float)
-    high_risk_month= rng.integers(0, 2, n).astype(float)
-
-    # Build scores using domain rules (ground-truth labels)
-    scores = np.zeros(n)
+def rule_scores(X: np.ndarray) -> np.ndarray:
+    """
+    Domain-rule risk scores for (n, 6) feature rows, unclipped and noise-free.
+    These are the training labels' ground truth, and the fallback scorer
+    while no model is loaded.
+    """
+    gauge_ratio, gauge_rate, precip_1hr, precip_6hr, in_zone, high_risk_month = X.T
+    scores = np.zeros(len(X))
 
     # Factor 1: gauge height ratio → 0–30 pts
     scores += np.where(gauge_ratio >= 1.0, 30,
@@ -110,18 +106,36 @@ def _generate_training_data(n: int = 3000):
 
     # Seasonal multiplier
     scores *= np.where(high_risk_month, 1.15, 1.0)
+    return scores
 
-    # Add realistic noise and clip
-    scores += rng.normal(0, 1.5, n)
-    scores = np.clip(scores, 0, 80)
+
+def _generate_training_data(n: int = 3000):
+    """Generate synthetic NJ flood training samples."""
+    rng = np.random.default_rng(42)
+
+    gauge_ratio    = rng.uniform(0.0, 1.6, n)       # height / flood_stage
+    gauge_rate     = rng.uniform(-0.2, 2.0, n)       # ft/hr
+    precip_1hr     = rng.uniform(0, 100, n)          # %
+    precip_6hr     = rng.uniform(0, 100, n)          # %
+    in_zone        = rng.integers(0, 2, n).astype(float)
+    high_risk_month= rng.integers(0, 2, n).astype(float)
 
     X = np.column_stack([gauge_ratio, gauge_rate, precip_1hr,
                          precip_6hr, in_zone, high_risk_month])
+
+    # Build scores using domain rules (ground-truth labels),
+    # add realistic noise and clip
+    scores = rule_scores(X)
+    scores += rng.normal(0, 1.5, n)
+    scores = np.clip(scores, 0, 80)
     return X, scores
 
 
 def _train_model():
-    """Train and save the GradientBoostingRegressor."""
+    """Train the GradientBoostingRegressor; returns the fitted (model, scaler)."""
+    from sklearn.ensemble import GradientBoostingRegressor
+    from sklearn.preprocessing import StandardScaler
+
     print("[FloodML] Training GradientBoostingRegressor...")
     X, y = _generate_training_data(3000)
 
@@ -136,28 +150,80 @@ def _train_model():
         random_state=42,
     )
     model.fit(X_scaled, y)
-
-    joblib.dump(model, _MODEL_PATH)
-    joblib.dump(scaler, _SCALER_PATH)
-    print("[FloodML] Model trained and saved.")
     return model, scaler
 
 
-def _load_or_train():
-    if os.path.exists(_MODEL_PATH) and os.path.exists(_SCALER_PATH):
-        try:
-            model = joblib.load(_MODEL_PATH)
-            scaler = joblib.load(_SCALER_PATH)
-            print("[FloodML] Model loaded from disk.")
-            return model, scaler
-        except Exception:
-            pass
-    return _train_model()
+class FloodMLModel:
+    def __init__(self, registry: ModelRegistry):
+        self.registry = registry
+
+    @property
+    def ready(self) -> bool:
+        return self.registry.active is not None
 
+    def status(self) -> dict:
+        active = self.registry.active
+        return {"ready": active is not None, "version": active.version if active else None}
 
-class FloodMLModel:
-    def __init__(self):
-        self._model, self._scaler = _load_or_train()
+    def assess_many(
+        self,
+        lats,
+        lngs,
+        stream_gauge_heights,
+        gauge_change_rates,
+        precip_prob_1hr,
+        precip_prob_6hr,
+        month: int,
+        flood_stage_ft,
+        in_zone=None,
+    ) -> dict:
+        """
+        Score a batch of points in one scaler + model pass.
+
+        All per-point arguments are equal-length arrays (or scalars, which
+        broadcast). in_zone, if given, overrides the flood-zone lookup for
+        callers that already know membership. Returns columnar arrays:
+            risk_score    — float, 0–80, rounded to 0.1
+            risk_level    — str level name per point
+            is_flood_zone — bool per point
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lngs = np.atleast_1d(np.asarray(lngs, dtype=np.float64))
+        n = len(lats)
+
+        if in_zone is None:
+            in_zone = is_flood_zone_many(lats, lngs)
+        else:
+            in_zone = np.broadcast_to(np.asarray(in_zone, dtype=bool), (n,))
+        gauge_ratio = (
+            np.asarray(stream_gauge_heights, dtype=np.float64)
+            / np.maximum(np.asarray(flood_stage_ft, dtype=np.float64), 1.0)
+        )
+        high_risk = 1.0 if month in HIGH_RISK_MONTHS else 0.0
+
+        features = np.empty((n, 6))
+        features[:, 0] = gauge_ratio
+        features[:, 1] = gauge_change_rates
+        features[:, 2] = precip_prob_1hr
+        features[:, 3] = precip_prob_6hr
+        features[:, 4] = in_zone
+        features[:, 5] = high_risk
+
+        model = self.registry.active          # one read: a swap mid-call can't mix versions
+        if model is None:
+            scores = np.round(np.clip(rule_scores(features), 0, 80), 1)
+        else:
+            if settings.RISK_CACHE_ENABLED:
+                scores = risk_cache.score(features, model.score, model.version)
+            else:
+                scores = model.score(features)
+            self.registry.maybe_shadow(features, scores)
+
+        return {
+            "risk_score": scores,
+            "risk_level": risk_levels(scores),
+            "is_flood_zone": in_zone,
+        }
 
     def assess_location(
         self,
@@ -171,30 +237,23 @@ class FloodMLModel:
         hour: int = 12,
         flood_stage_ft: float = 12.0,
     ) -> dict:
-        in_zone = is_flood_zone(lat, lng)
-        gauge_ratio = stream_gauge_height / max(flood_stage_ft, 1.0)
-        high_risk = 1.0 if month in HIGH_RISK_MONTHS else 0.0
-
-        features = np.array([[
-            gauge_ratio,
-            gauge_change_rate,
-            precip_prob_1hr,
-            precip_prob_6hr,
-            float(in_zone),
-            high_risk,
-        ]])
-
-        X_scaled = self._scaler.transform(features)
-        score = float(np.clip(self._model.predict(X_scaled)[0], 0, 80))
-        score = round(score, 1)
+        batch = self.assess_many(
+            [lat], [lng],
+            stream_gauge_height, gauge_change_rate,
+            precip_prob_1hr, precip_prob_6hr,
+            month, flood_stage_ft,
+        )
+        score = float(batch["risk_score"][0])
+        in_zone = bool(batch["is_flood_zone"][0])
 
         return {
             "risk_score": score,
             "risk_level": _risk_level(score),
             "is_flood_zone": in_zone,
-            "recommendation": _recommendation(score, in_zone),
+            "recommendation": recommendation(score, in_zone),
         }
 
 
-# Singleton
-flood_model = FloodMLModel()
+# Singletons — the registry is empty until its watcher runs (see main.py lifespan)
+model_registry = ModelRegistry(settings.MODEL_ARTIFACT_DIR, _LEVEL_BOUNDS)
+flood_model = FloodMLModel(model_registry)
@@ -0,0 +1,73 @@
+"""
+FEMA flood-zone membership.
+
+Zone polygons are loaded from a GeoJSON FeatureCollection at
+FLOOD_ZONES_PATH (default: bundled app/data/nj_flood_zones.geojson, which
+holds the eight legacy NJ high-risk areas). An NFHL flood hazard layer
+export (S_FLD_HAZ_AR converted to GeoJSON in EPSG:4326) can be dropped in
+directly — features with SFHA_TF = "F" (outside the Special Flood Hazard
+Area) are skipped.
+
+Polygons are prepared and held in a shapely STRtree, so each point test is
+an R-tree probe plus a prepared-geometry check, and is_flood_zone_many
+answers a whole route in one vectorized call.
+"""
+
+import json
+import os
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+from app.config import settings
+
+_DEFAULT_FLOOD_ZONES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "nj_flood_zones.geojson"
+)
+
+
+class FloodZoneIndex:
+    def __init__(self, geometries: list, names: list[str]):
+        self.geometries = np.array(geometries, dtype=object)
+        self.names = names
+        shapely.prepare(self.geometries)
+        self._tree = shapely.STRtree(self.geometries)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def contains_many(self, lats, lngs) -> np.ndarray:
+        """Boolean array: whether each point lies in (or on the edge of) any zone."""
+        points = shapely.points(np.asarray(lngs, dtype=np.float64), np.asarray(lats, dtype=np.float64))
+        hits = np.zeros(len(points), dtype=bool)
+        if len(self):
+            point_idx, _ = self._tree.query(points, predicate="intersects")
+            hits[point_idx] = True
+        return hits
+
+
+def load_flood_zones(path: str) -> FloodZoneIndex:
+    with open(path) as f:
+        features = json.load(f)["features"]
+    geometries, names = [], []
+    for feat in features:
+        props = feat.get("properties") or {}
+        if props.get("SFHA_TF") == "F":
+            continue
+        geometries.append(shape(feat["geometry"]))
+        names.append(props.get("name") or props.get("FLD_ZONE") or "")
+    print(f"[FloodZones] Loaded {len(geometries)} flood-zone polygons")
+    return FloodZoneIndex(geometries, names)
+
+
+flood_zone_index = load_flood_zones(settings.FLOOD_ZONES_PATH or _DEFAULT_FLOOD_ZONES_PATH)
+
+
+def is_flood_zone_many(lats, lngs) -> np.ndarray:
+    """Vectorized is_flood_zone over arrays of lat/lng."""
+    return flood_zone_index.contains_many(lats, lngs)
+
+
+def is_flood_zone(lat: float, lng: float) -> bool:
+    return bool(flood_zone_index.contains_many([lat], [lng])[0])
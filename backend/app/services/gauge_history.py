@@ -0,0 +1,121 @@
+"""
+Per-gauge time-series history.
+
+Each USGS site gets a fixed-capacity ring buffer of (timestamp, height)
+backed by two numpy arrays — no per-reading dicts. Buffers are fed
+incrementally with only the readings newer than the last one stored, so
+memory per site stays bounded and rate-of-change can be computed over any
+window without re-downloading.
+
+Timestamps are stored as UTC epoch seconds (int64), heights in feet (float32).
+"""
+
+import numpy as np
+
+from app.config import settings
+
+
+class GaugeRingBuffer:
+    """Fixed-capacity, append-only ring buffer of gauge readings."""
+
+    __slots__ = ("_times", "_heights", "_head", "_size")
+
+    def __init__(self, capacity: int):
+        self._times   = np.zeros(capacity, dtype=np.int64)
+        self._heights = np.zeros(capacity, dtype=np.float32)
+        self._head = 0      # index the next reading is written to
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._times)
+
+    @property
+    def last_time(self) -> int | None:
+        """Epoch seconds of the newest reading, or None if empty."""
+        if not self._size:
+            return None
+        return int(self._times[(self._head - 1) % self.capacity])
+
+    def extend(self, times: np.ndarray, heights: np.ndarray) -> int:
+        """
+        Append readings (ascending by time). Readings at or before the newest
+        stored timestamp are ignored, so overlapping fetches are harmless.
+        Returns the number of readings appended.
+        """
+        times   = np.asarray(times, dtype=np.int64)
+        heights = np.asarray(heights, dtype=np.float32)
+        last = self.last_time
+        if last is not None:
+            keep = times > last
+            times, heights = times[keep], heights[keep]
+
+        n = len(times)
+        if n == 0:
+            return 0
+        if n > self.capacity:
+            times, heights = times[-self.capacity:], heights[-self.capacity:]
+
+        idx = (self._head + np.arange(len(times))) % self.capacity
+        self._times[idx]   = times
+        self._heights[idx] = heights
+        self._head = int((self._head + len(times)) % self.capacity)
+        self._size = min(self._size + len(times), self.capacity)
+        return len(times)
+
+    def since(self, start: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return (times, heights) in chronological order with time >= start."""
+        idx = (self._head - self._size + np.arange(self._size)) % self.capacity
+        times = self._times[idx]
+        first = int(np.searchsorted(times, start, side="left"))
+        return times[first:], self._heights[idx[first:]]
+
+    def latest(self) -> tuple[int, float] | None:
+        """Return the newest (time, height), or None if empty."""
+        if not self._size:
+            return None
+        i = (self._head - 1) % self.capacity
+        return int(self._times[i]), float(self._heights[i])
+
+    def rate_ft_per_hr(self, window_s: float) -> float:
+        """
+        Rise rate over the trailing window ending at the newest reading:
+        (newest height − oldest height in window) / elapsed hours.
+        With fewer than two readings in the window (a missed reading, an
+        hourly-reporting site) falls back to the last two readings; 0.0 if
+        there are not two at all.
+        """
+        last = self.last_time
+        if last is None:
+            return 0.0
+        times, heights = self.since(last - int(window_s))
+        if len(times) < 2:
+            if self._size < 2:
+                return 0.0
+            idx = (self._head - 2 + np.arange(2)) % self.capacity
+            times, heights = self._times[idx], self._heights[idx]
+        hours = int(times[-1] - times[0]) / 3600
+        return float(heights[-1] - heights[0]) / hours
+
+
+_buffers: dict[str, GaugeRingBuffer] = {}
+
+
+def buffer_for(site: str) -> GaugeRingBuffer:
+    """Return the ring buffer for a site, creating it on first use."""
+    buf = _buffers.get(site)
+    if buf is None:
+        buf = _buffers[site] = GaugeRingBuffer(settings.GAUGE_HISTORY_CAPACITY)
+    return buf
+
+
+def oldest_last_time(sites) -> int | None:
+    """
+    Newest stored timestamp of the most out-of-date site that has history,
+    or None if no site has history yet (the caller must then seed).
+    """
+    lasts = [t for t in (buffer_for(s).last_time for s in sites) if t is not None]
+    return min(lasts) if lasts else None
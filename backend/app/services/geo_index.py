@@ -0,0 +1,57 @@
+"""
+Geodesic nearest-neighbour index over lat/lng points.
+
+Points are embedded as unit vectors on the sphere and stored in a KD-tree
+(scipy cKDTree). Straight-line (chord) distance between unit vectors is
+monotonic in great-circle distance, so k-nearest queries on the tree are
+exact spherical k-NN — no squared-degree distortion at NJ latitudes — and
+stay O(log n) as the catalog grows.
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def unit_vectors(lats, lngs) -> np.ndarray:
+    """(n, 3) array of unit vectors for arrays of lat/lng in degrees."""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lng = np.radians(np.asarray(lngs, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)])
+
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    """Unit-sphere chord length → great-circle distance in km."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+
+class GeoIndex:
+    """Immutable k-NN index; rebuild to add points."""
+
+    def __init__(self, lats, lngs):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+        self._tree = cKDTree(unit_vectors(self.lats, self.lngs)) if len(self.lats) else None
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def nearest_many(self, lats, lngs, k: int = 1) -> tuple[np.ndarray, np.ndarray]:
+        """
+        k nearest indexed points for each query point.
+        Returns (distances_km, indices), both shaped (n, k), closest first.
+        """
+        n = len(np.atleast_1d(lats))
+        k = min(k, len(self))
+        if self._tree is None or k == 0:
+            return np.empty((n, 0)), np.empty((n, 0), dtype=np.intp)
+        chord, idx = self._tree.query(unit_vectors(np.atleast_1d(lats), np.atleast_1d(lngs)), k=k)
+        chord, idx = chord.reshape(n, k), idx.reshape(n, k)
+        return chord_to_km(chord), idx
+
+    def nearest(self, lat: float, lng: float, k: int = 1) -> tuple[np.ndarray, np.ndarray]:
+        """k nearest indexed points to one location: (distances_km, indices)."""
+        dist, idx = self.nearest_many([lat], [lng], k)
+        return dist[0], idx[0]
@@ -0,0 +1,67 @@
+"""
+Shared upstream HTTP clients.
+
+One pooled httpx.AsyncClient per upstream host, created in main.lifespan and
+shared by every service. Requests ride on warm keep-alive (HTTP/2 where the
+host supports it) connections instead of paying a fresh TCP+TLS handshake
+on every call.
+
+Pool sizes and per-host timeouts are tunable through settings (HTTP_*,
+USGS_TIMEOUT_S, NWS_TIMEOUT_S, GOOGLE_TIMEOUT_S).
+"""
+
+import httpx
+
+from app.config import settings
+
+# Upstream names — one pooled client each
+USGS   = "usgs"     # waterservices.usgs.gov
+NWS    = "nws"      # api.weather.gov
+GOOGLE = "google"   # maps.googleapis.com (Directions, Geocoding, Places)
+
+_TIMEOUTS = {
+    USGS:   lambda: settings.USGS_TIMEOUT_S,
+    NWS:    lambda: settings.NWS_TIMEOUT_S,
+    GOOGLE: lambda: settings.GOOGLE_TIMEOUT_S,
+}
+
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_S,
+    )
+    return httpx.AsyncClient(
+        http2=settings.HTTP2_ENABLED,
+        limits=limits,
+        timeout=httpx.Timeout(_TIMEOUTS[name]()),
+    )
+
+
+async def init_clients() -> None:
+    """Open one pooled client per upstream. Called from main.lifespan."""
+    for name in _TIMEOUTS:
+        if name not in _clients or _clients[name].is_closed:
+            _clients[name] = _build_client(name)
+
+
+async def close_clients() -> None:
+    """Close all pooled clients, draining their connections."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """
+    Return the shared client for an upstream.
+    Built lazily if the app lifespan has not run (scripts, REPL).
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = _build_client(name)
+    return client
@@ -0,0 +1,221 @@
+"""
+Hot-swappable flood-model registry with shadow scoring.
+
+The registry holds the active model version and an optional shadow
+candidate, both loaded from the artifact store (model_store.py).
+run_watcher() polls the store's CURRENT / SHADOW pointers every
+MODEL_WATCH_INTERVAL_S. A changed version is verified and memory-mapped
+on a worker thread, then swapped in with a single reference assignment, so
+in-flight requests finish on the model they started with and nothing is
+dropped. MODEL_VERSION pins the active version and disables CURRENT.
+
+Shadow scoring: for a MODEL_SHADOW_SAMPLE_RATE fraction of scoring calls
+(/flood/risk, route scoring, ...) the feature batch and the served scores
+are queued; run_shadow_worker() scores them with the candidate on a worker
+thread, off the request path. The queue is bounded — when it is full the
+sample is dropped and counted rather than slowing requests down.
+
+Metrics, per version: call/point counts and recent latency percentiles.
+Per shadow version: score divergence from what was served (mean / max
+|Δscore|, fraction of points whose risk level would change).
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.services.model_store import ArtifactError, current_version, load_artifact, shadow_version
+from app.services.risk_cache import risk_cache
+from app.services.tree_ensemble import TreeEnsemble
+
+_LATENCY_SAMPLES = 1024     # recent calls kept per version for percentiles
+
+
+class LatencyStats:
+    def __init__(self):
+        self.calls = 0
+        self.points = 0
+        self._recent = np.zeros(_LATENCY_SAMPLES)
+        self._lock = threading.Lock()     # recorded from executor threads
+
+    def record(self, seconds: float, points: int) -> None:
+        with self._lock:
+            self._recent[self.calls % _LATENCY_SAMPLES] = seconds
+            self.calls += 1
+            self.points += points
+
+    def snapshot(self) -> dict:
+        recent = self._recent[:min(self.calls, _LATENCY_SAMPLES)] * 1000
+        p50, p95, p99 = np.percentile(recent, [50, 95, 99]) if len(recent) else (0.0, 0.0, 0.0)
+        return {
+            "calls": self.calls,
+            "points": self.points,
+            "latency_ms_p50": round(float(p50), 3),
+            "latency_ms_p95": round(float(p95), 3),
+            "latency_ms_p99": round(float(p99), 3),
+        }
+
+
+class DivergenceStats:
+    def __init__(self):
+        self.batches = 0
+        self.points = 0
+        self.dropped = 0
+        self._abs_sum = 0.0
+        self._abs_max = 0.0
+        self._level_changes = 0
+
+    def record(self, served: np.ndarray, shadow: np.ndarray, level_bounds: np.ndarray) -> None:
+        diff = np.abs(shadow - served)
+        self.batches += 1
+        self.points += len(diff)
+        self._abs_sum += float(diff.sum())
+        self._abs_max = max(self._abs_max, float(diff.max(initial=0.0)))
+        self._level_changes += int(np.count_nonzero(
+            np.searchsorted(level_bounds, served, side="left")
+            != np.searchsorted(level_bounds, shadow, side="left")
+        ))
+
+    def snapshot(self) -> dict:
+        return {
+            "batches": self.batches,
+            "points": self.points,
+            "dropped": self.dropped,
+            "mean_abs_diff": round(self._abs_sum / self.points, 4) if self.points else 0.0,
+            "max_abs_diff": round(self._abs_max, 4),
+            "level_change_rate": round(self._level_changes / self.points, 4) if self.points else 0.0,
+        }
+
+
+class ModelVersion:
+    """One loaded artifact version and its serving metrics."""
+
+    def __init__(self, version: str, ensemble: TreeEnsemble, latency: LatencyStats):
+        self.version = version
+        self.ensemble = ensemble
+        self.latency = latency
+
+    def score(self, features: np.ndarray) -> np.ndarray:
+        """Raw feature rows → risk scores, clipped to 0–80 and rounded to 0.1."""
+        start = time.perf_counter()
+        scores = np.round(np.clip(self.ensemble.predict(features), 0, 80), 1)
+        self.latency.record(time.perf_counter() - start, len(features))
+        return scores
+
+
+class ModelRegistry:
+    def __init__(self, root: str, level_bounds: np.ndarray):
+        self.root = root
+        self.level_bounds = level_bounds
+        self.active: ModelVersion | None = None
+        self.shadow: ModelVersion | None = None
+        self._latency: dict[str, LatencyStats] = {}
+        self._divergence: dict[str, DivergenceStats] = {}
+        self._failed: set[str] = set()
+        self._warned_no_model = False
+        self._shadow_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.MODEL_SHADOW_QUEUE_MAX)
+        self._loop: asyncio.AbstractEventLoop | None = None     # set by run_shadow_worker
+
+    # ── Loading / swapping ──────────────────────────────────────────────
+
+    def _load(self, version: str) -> ModelVersion | None:
+        for loaded in (self.active, self.shadow):
+            if loaded is not None and loaded.version == version:
+                return loaded
+        if version in self._failed:
+            return None
+        start = time.perf_counter()
+        try:
+            _, arrays = load_artifact(self.root, version)
+            ensemble = TreeEnsemble(arrays)
+        except ArtifactError as e:
+            print(f"[ModelRegistry] {e}")
+            self._failed.add(version)
+            return None
+        print(f"[ModelRegistry] Loaded {version} in {time.perf_counter() - start:.2f}s "
+              f"({ensemble.n_trees} trees)")
+        return ModelVersion(version, ensemble, self._latency.setdefault(version, LatencyStats()))
+
+    def sync(self) -> None:
+        """
+        Bring active / shadow in line with the store's pointers. Blocking
+        (checksums + mmap) — run it off the event loop.
+        """
+        want_active = settings.MODEL_VERSION or current_version(self.root)
+        want_shadow = shadow_version(self.root)
+
+        if want_active and (self.active is None or self.active.version != want_active):
+            loaded = self._load(want_active)
+            if loaded is not None:
+                previous, self.active = self.active, loaded
+                risk_cache.clear()
+                print(f"[ModelRegistry] Serving {loaded.version}"
+                      + (f" (was {previous.version})" if previous else ""))
+
+        if want_shadow == (self.active.version if self.active else None):
+            want_shadow = None
+        if want_shadow != (self.shadow.version if self.shadow else None):
+            self.shadow = self._load(want_shadow) if want_shadow else None
+            if self.shadow is not None:
+                self._divergence.setdefault(self.shadow.version, DivergenceStats())
+                print(f"[ModelRegistry] Shadow scoring {self.shadow.version} "
+                      f"at {settings.MODEL_SHADOW_SAMPLE_RATE:.0%} of calls")
+
+    async def run_watcher(self) -> None:
+        """Initial load, then re-sync with the store every MODEL_WATCH_INTERVAL_S."""
+        while True:
+            try:
+                await asyncio.to_thread(self.sync)
+            except Exception as e:
+                print(f"[ModelRegistry] Sync failed: {e}")
+            if self.active is None and not self._warned_no_model:
+                self._warned_no_model = True
+                print("[ModelRegistry] No model artifact — serving rule-based scores. "
+                      "Build one with: python -m app.services.model_store build")
+            await asyncio.sleep(settings.MODEL_WATCH_INTERVAL_S)
+
+    # ── Shadow scoring ──────────────────────────────────────────────────
+
+    def maybe_shadow(self, features: np.ndarray, served: np.ndarray) -> None:
+        """
+        Queue a sampled batch for shadow scoring. Never blocks; safe to call
+        from executor threads (the enqueue is handed to the event loop).
+        """
+        shadow = self.shadow
+        if shadow is None or self._loop is None or random.random() >= settings.MODEL_SHADOW_SAMPLE_RATE:
+            return
+        self._loop.call_soon_threadsafe(self._enqueue_shadow, (shadow, features.copy(), served.copy()))
+
+    def _enqueue_shadow(self, item: tuple) -> None:
+        try:
+            self._shadow_queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self._divergence[item[0].version].dropped += 1
+
+    def _score_shadow(self, shadow: ModelVersion, features: np.ndarray, served: np.ndarray) -> None:
+        self._divergence[shadow.version].record(served, shadow.score(features), self.level_bounds)
+
+    async def run_shadow_worker(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        while True:
+            shadow, features, served = await self._shadow_queue.get()
+            try:
+                await asyncio.to_thread(self._score_shadow, shadow, features, served)
+            except Exception as e:
+                print(f"[ModelRegistry] Shadow scoring failed: {e}")
+
+    # ── Status ──────────────────────────────────────────────────────────
+
+    def status(self) -> dict:
+        return {
+            "active": self.active.version if self.active else None,
+            "shadow": self.shadow.version if self.shadow else None,
+            "shadow_sample_rate": settings.MODEL_SHADOW_SAMPLE_RATE,
+            # list() — the watcher thread may add versions meanwhile
+            "versions": [{"version": v, **stats.snapshot()} for v, stats in list(self._latency.items())],
+            "divergence": [{"version": v, **stats.snapshot()} for v, stats in list(self._divergence.items())],
+        }
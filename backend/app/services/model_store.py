@@ -0,0 +1,238 @@
+"""
+Versioned, checksummed flood-model artifact store.
+
+Layout under MODEL_ARTIFACT_DIR:
+
+    CURRENT                  ← name of the version to serve (one line)
+    SHADOW                   ← optional candidate scored in shadow (one line)
+    20261017T120000Z/
+        manifest.json        ← version, created_at, metadata, sha256 per array
+        feature.npy
+        threshold.npy
+        ...                  ← one .npy per tree_ensemble array
+
+Versions are written to a temp directory and renamed into place, and
+CURRENT is replaced atomically, so a reader never sees half an artifact.
+Arrays are checksummed against the manifest and then opened memory-mapped
+(np.load mmap_mode="r"): startup pays for one sequential hash read, not a
+deserialize-and-copy.
+
+Artifacts are built offline, never on import:
+
+    cd backend
+    python -m app.services.model_store build            # train, save, activate
+    python -m app.services.model_store list
+    python -m app.services.model_store activate <version>
+    python -m app.services.model_store shadow <version> | --clear
+
+A running server watches CURRENT and SHADOW and swaps versions in without
+a restart (see model_registry.py).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.services.tree_ensemble import ARRAY_NAMES, OPTIONAL_ARRAY_NAMES
+
+MANIFEST = "manifest.json"
+CURRENT = "CURRENT"
+SHADOW = "SHADOW"
+FORMAT_VERSION = 1
+
+
+class ArtifactError(Exception):
+    """Missing, incomplete or corrupt model artifact."""
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def list_versions(root: str) -> list[str]:
+    """Complete versions under root, oldest first (names sort by time)."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root)
+        if not name.startswith(".") and os.path.isfile(os.path.join(root, name, MANIFEST))
+    )
+
+
+def _read_pointer(root: str, pointer: str) -> str | None:
+    try:
+        with open(os.path.join(root, pointer)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_pointer(root: str, pointer: str, version: str | None) -> None:
+    """Atomically point a pointer file at version (None removes it)."""
+    if version is None:
+        try:
+            os.remove(os.path.join(root, pointer))
+        except FileNotFoundError:
+            pass
+        return
+    if version not in list_versions(root):
+        raise ArtifactError(f"no such model version: {version}")
+    tmp = os.path.join(root, f".{pointer}.tmp")
+    with open(tmp, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp, os.path.join(root, pointer))
+
+
+def current_version(root: str) -> str | None:
+    """Version named by CURRENT, else the newest complete version."""
+    version = _read_pointer(root, CURRENT)
+    if version:
+        return version
+    versions = list_versions(root)
+    return versions[-1] if versions else None
+
+
+def shadow_version(root: str) -> str | None:
+    """Version named by SHADOW, if any."""
+    return _read_pointer(root, SHADOW)
+
+
+def activate(root: str, version: str) -> None:
+    """Point CURRENT at version (atomic replace)."""
+    _write_pointer(root, CURRENT, version)
+
+
+def set_shadow(root: str, version: str | None) -> None:
+    """Point SHADOW at version, or clear it with None."""
+    _write_pointer(root, SHADOW, version)
+
+
+def save_artifact(root: str, arrays: dict[str, np.ndarray], meta: dict | None = None,
+                  version: str | None = None) -> str:
+    """Write arrays as a new version; returns the version name."""
+    version = version or time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    final = os.path.join(root, version)
+    if os.path.exists(final):
+        raise ArtifactError(f"model version already exists: {version}")
+
+    tmp = os.path.join(root, f".{version}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    files = {}
+    for name in ARRAY_NAMES + tuple(n for n in OPTIONAL_ARRAY_NAMES if n in arrays):
+        arr = np.ascontiguousarray(arrays[name])
+        path = os.path.join(tmp, f"{name}.npy")
+        np.save(path, arr)
+        files[name] = {
+            "file": f"{name}.npy",
+            "sha256": _sha256(path),
+            "dtype": str(arr.dtype),
+            "shape": list(arr.shape),
+        }
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "meta": meta or {},
+        "arrays": files,
+    }
+    with open(os.path.join(tmp, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.rename(tmp, final)
+    return version
+
+
+def load_artifact(root: str, version: str | None = None) -> tuple[dict, dict[str, np.ndarray]]:
+    """
+    Verify and memory-map one version (default: current_version).
+    Returns (manifest, arrays); raises ArtifactError on any mismatch.
+    """
+    version = version or current_version(root)
+    if version is None:
+        raise ArtifactError(f"no model artifacts in {os.path.abspath(root)}")
+    vdir = os.path.join(root, version)
+    try:
+        with open(os.path.join(vdir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"unreadable manifest for {version}: {e}") from e
+    if not isinstance(manifest, dict):
+        raise ArtifactError(f"{version}: manifest is not a JSON object")
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ArtifactError(f"unsupported artifact format {manifest.get('format')} in {version}")
+
+    listed = manifest.get("arrays")
+    if not isinstance(listed, dict):
+        raise ArtifactError(f"{version}: manifest has no arrays table")
+    missing = set(ARRAY_NAMES) - set(listed)
+    if missing:
+        raise ArtifactError(f"{version}: manifest lists no {sorted(missing)} arrays")
+
+    arrays = {}
+    for name, entry in listed.items():
+        if not isinstance(entry, dict) or "file" not in entry or "sha256" not in entry:
+            raise ArtifactError(f"{version}: malformed manifest entry for {name}")
+        path = os.path.join(vdir, entry["file"])
+        if not os.path.isfile(path) or _sha256(path) != entry["sha256"]:
+            raise ArtifactError(f"{version}: checksum mismatch for {entry['file']}")
+        arrays[name] = np.load(path, mmap_mode="r")
+    return manifest, arrays
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.services.model_store")
+    parser.add_argument("--dir", default=settings.MODEL_ARTIFACT_DIR, help="artifact directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="train the flood model and save a new version")
+    build.add_argument("--version", help="version name (default: UTC timestamp)")
+    build.add_argument("--no-activate", action="store_true", help="don't point CURRENT at it")
+    sub.add_parser("list", help="list versions")
+    act = sub.add_parser("activate", help="point CURRENT at a version")
+    act.add_argument("version")
+    shadow = sub.add_parser("shadow", help="score a candidate version in shadow")
+    shadow.add_argument("version", nargs="?")
+    shadow.add_argument("--clear", action="store_true", help="stop shadow scoring")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        from app.services.flood_ml import _train_model
+        from app.services.tree_ensemble import export_ensemble
+
+        os.makedirs(args.dir, exist_ok=True)
+        model, scaler = _train_model()
+        meta = {"estimator": type(model).__name__, "params": model.get_params()}
+        version = save_artifact(args.dir, export_ensemble(model, scaler), meta, args.version)
+        if not args.no_activate:
+            activate(args.dir, version)
+        print(f"[ModelStore] Saved {version} to {os.path.abspath(args.dir)}"
+              + ("" if args.no_activate else " (active)"))
+    elif args.command == "list":
+        active, candidate = current_version(args.dir), shadow_version(args.dir)
+        for version in list_versions(args.dir):
+            mark = "* " if version == active else "s " if version == candidate else "  "
+            print(mark + version)
+    elif args.command == "activate":
+        activate(args.dir, args.version)
+        print(f"[ModelStore] {args.version} is now active")
+    elif args.command == "shadow":
+        if args.clear == bool(args.version):
+            parser.error("shadow takes a version or --clear")
+        set_shadow(args.dir, None if args.clear else args.version)
+        print(f"[ModelStore] Shadow {'cleared' if args.clear else 'set to ' + args.version}")
+
+
+if __name__ == "__main__":
+    _cli()
@@ -6,13 +6,200 @@ Docs: https://www.weather.gov/documentation/services-web-api
 Returns raw precipitation PROBABILITY (0-100%) — not fabricated inch estimates.
 PoP (Probability of Precipitation) = chance that measurable rain will fall.
 It says nothing about how much rain, so we use it directly as a probability signal.
+
+Two-tier cache:
+  - points → grid cell: persisted to NWS_GRID_CACHE_PATH (the /points
+    mapping never changes; points NWS answers with a 4xx, e.g. offshore,
+    are cached as unresolvable too). Capped at NWS_GRID_CACHE_MAX points, oldest
+    evicted first; new points are written in one batch NWS_GRID_SAVE_DELAY_S
+    after the first unsaved one, off the event loop.
+  - grid cell → forecast: in memory, expires when the upstream
+    Cache-Control / Expires headers say the forecast goes stale
+A warm lookup makes zero NWS round trips.
 """
 
+import asyncio
+import json
+import os
+import time
+from email.utils import parsedate_to_datetime
+
 import httpx
 
+from app.config import settings
+from app.services.circuit_breaker import breaker
+from app.services.http_client import get_client, NWS
+from app.services.single_flight import SingleFlight
+from app.services.ttl_cache import TTLCache
+
 NWS_BASE = "https://api.weather.gov"
 NWS_HEADERS = {"User-Agent": "waterWise/1.0 (waterwise-app@example.com)"}
 
+# Returned when NWS is unreachable
+FALLBACK_PRECIP = {
+    "precip_prob_1hr_pct":  0,
+    "precip_prob_6hr_pct":  0,
+    "precip_prob_24hr_pct": 0,
+    "source": "fallback",
+}
+
+# NWS grid cell key: (office gridId, gridX, gridY)
+GridCell = tuple[str, int, int]
+
+_grid_points: dict[str, dict] | None = None     # "lat,lng" (3dp) → {"cell": [gridId, x, y] or None}
+_forecasts = TTLCache(default_ttl_s=settings.NWS_FORECAST_TTL_S)
+_inflight  = SingleFlight()     # coalesces concurrent misses for the same point / cell
+_save_task: asyncio.Task | None = None          # pending debounced grid-cache write
+
+
+def _point_key(lat: float, lng: float) -> str:
+    # 3 decimals ≈ 110 m — far finer than a 2.5 km NWS grid cell
+    return f"{lat:.3f},{lng:.3f}"
+
+
+def _load_grid_points() -> dict[str, dict]:
+    global _grid_points
+    if _grid_points is None:
+        try:
+            with open(settings.NWS_GRID_CACHE_PATH) as f:
+                _grid_points = json.load(f)
+        except (OSError, ValueError):
+            _grid_points = {}
+        _evict_grid_points()
+    return _grid_points
+
+
+def _evict_grid_points() -> None:
+    """Drop the oldest points (dict order is insertion order) beyond NWS_GRID_CACHE_MAX."""
+    excess = len(_grid_points) - settings.NWS_GRID_CACHE_MAX
+    for key in list(_grid_points)[:max(excess, 0)]:
+        del _grid_points[key]
+
+
+def _write_grid_points(points: dict[str, dict]) -> None:
+    tmp = f"{settings.NWS_GRID_CACHE_PATH}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(points, f)
+        os.replace(tmp, settings.NWS_GRID_CACHE_PATH)
+    except OSError as e:
+        print(f"[NWS] Could not persist grid cache — {e}")
+
+
+async def _save_grid_points_later() -> None:
+    global _save_task
+    try:
+        await asyncio.sleep(settings.NWS_GRID_SAVE_DELAY_S)
+    finally:
+        _save_task = None
+    # Copy on the loop so the writer thread never sees the dict mutate
+    await asyncio.to_thread(_write_grid_points, dict(_grid_points))
+
+
+def _schedule_grid_save() -> None:
+    global _save_task
+    if _save_task is None:
+        _save_task = asyncio.get_running_loop().create_task(_save_grid_points_later())
+
+
+def flush_grid_points() -> None:
+    """Write any unsaved grid points now. Called from main.lifespan on shutdown."""
+    global _save_task
+    if _save_task is not None:
+        _save_task.cancel()
+        _save_task = None
+        _write_grid_points(dict(_grid_points))
+
+
+def _ttl_from_headers(headers) -> float | None:
+    """Seconds until the response goes stale per Cache-Control / Expires."""
+    for directive in headers.get("cache-control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name.lower() in ("no-store", "no-cache"):
+            return 0.0
+        if name.lower() == "max-age" and value.isdigit():
+            age = headers.get("age", "0")
+            return int(value) - (int(age) if age.isdigit() else 0)
+    if "expires" in headers:
+        try:
+            return parsedate_to_datetime(headers["expires"]).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return 0.0
+    return None
+
+
+async def resolve_grid(lat: float, lng: float) -> GridCell | None:
+    """
+    Resolve a lat/lng to its NWS grid cell (permanently cached).
+    Returns None if NWS cannot resolve the point.
+    """
+    key = _point_key(lat, lng)
+    entry = _load_grid_points().get(key)
+    if entry is None:
+        entry = await _inflight.do(("points", key), _fetch_grid_point, key)
+        if entry is None:
+            return None
+    return tuple(entry["cell"]) if entry["cell"] is not None else None
+
+
+async def _fetch_grid_point(key: str) -> dict | None:
+    try:
+        async with breaker("nws"):
+            resp = await get_client(NWS).get(f"{NWS_BASE}/points/{key}", headers=NWS_HEADERS)
+            resp.raise_for_status()
+        props = resp.json()["properties"]
+        entry = {"cell": [props["gridId"], int(props["gridX"]), int(props["gridY"])]}
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code >= 500:
+            return None
+        entry = {"cell": None}      # outside NWS coverage — never ask again
+    except Exception:
+        return None
+    _load_grid_points()[key] = entry
+    _evict_grid_points()
+    _schedule_grid_save()
+    return entry
+
+
+def _hourly_url(cell: GridCell) -> str:
+    grid_id, x, y = cell
+    return f"{NWS_BASE}/gridpoints/{grid_id}/{x},{y}/forecast/hourly"
+
+
+async def get_grid_forecast(cell: GridCell) -> dict:
+    """
+    Fetch (or serve from cache) the precipitation summary for one grid cell.
+    Same return shape as get_precip_forecast.
+    """
+    cached = _forecasts.get(cell)
+    if cached is not None:
+        return cached
+    return await _inflight.do(("forecast", cell), _fetch_grid_forecast, cell)
+
+
+async def _fetch_grid_forecast(cell: GridCell) -> dict:
+    try:
+        async with breaker("nws"):
+            resp = await get_client(NWS).get(_hourly_url(cell), headers=NWS_HEADERS)
+            resp.raise_for_status()
+        periods = resp.json()["properties"]["periods"]
+    except Exception:
+        return dict(FALLBACK_PRECIP)
+
+    def pop(period) -> int:
+        """Extract precipitation probability, default 0 if missing."""
+        val = period.get("probabilityOfPrecipitation", {})
+        return int(val.get("value") or 0)
+
+    result = {
+        "precip_prob_1hr_pct":  pop(periods[0]),
+        "precip_prob_6hr_pct":  max(pop(p) for p in periods[:6]),
+        "precip_prob_24hr_pct": max(pop(p) for p in periods[:24]),
+        "source": "NWS",
+    }
+    _forecasts.set(cell, result, _ttl_from_headers(resp.headers))
+    return result
+
 
 async def get_precip_forecast(lat: float, lng: float) -> dict:
     """
@@ -24,38 +211,7 @@ async def get_precip_forecast(lat: float, lng: float) -> dict:
         precip_prob_24hr_pct — max probability over next 24 hours  (0-100)
         source               — "NWS" if live, "fallback" if unavailable
     """
-    try:
-        async with httpx.AsyncClient(timeout=8.0, headers=NWS_HEADERS) as client:
-            # Step 1: resolve lat/lng to NWS grid point
-            point_resp = await client.get(f"{NWS_BASE}/points/{lat:.4f},{lng:.4f}")
-            point_resp.raise_for_status()
-            hourly_url = point_resp.json()["properties"]["forecastHourly"]
-
-            # Step 2: fetch hourly forecast periods
-            forecast_resp = await client.get(hourly_url)
-            forecast_resp.raise_for_status()
-            periods = forecast_resp.json()["properties"]["periods"]
-
-        def pop(period) -> int:
-            """Extract precipitation probability, default 0 if missing."""
-            val = period.get("probabilityOfPrecipitation", {})
-            return int(val.get("value") or 0)
-
-        prob_1hr  = pop(periods[0])
-        prob_6hr  = max(pop(p) for p in periods[:6])
-        prob_24hr = max(pop(p) for p in periods[:24])
-
-        return {
-            "precip_prob_1hr_pct":  prob_1hr,
-            "precip_prob_6hr_pct":  prob_6hr,
-            "precip_prob_24hr_pct": prob_24hr,
-            "source": "NWS",
-        }
-
-    except Exception:
-        return {
-            "precip_prob_1hr_pct":  0,
-            "precip_prob_6hr_pct":  0,
-            "precip_prob_24hr_pct": 0,
-            "source": "fallback",
-        }
+    cell = await resolve_grid(lat, lng)
+    if cell is None:
+        return dict(FALLBACK_PRECIP)
+    return await get_grid_forecast(cell)
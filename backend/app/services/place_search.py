@@ -0,0 +1,213 @@
+"""
+Local prefix index for location autocomplete.
+
+Autocomplete is the highest-QPS endpoint, and most of what people type is
+a handful of town names and landmarks. Those are held in a sorted-array
+index (bisect over normalized keys) built off the event loop at startup
+from:
+  - NJ municipalities and landmarks (app/data/nj_places.json)
+  - the local safe-place index ("University Hospital, 150 Bergen St, Newark")
+  - optionally (AUTOCOMPLETE_LEARN_ADDRESSES, off by default), formatted
+    addresses users geocode. Suggestions are shared by every user, so an
+    address is only learned once it has been geocoded
+    AUTOCOMPLETE_LEARN_MIN_LOOKUPS times within AUTOCOMPLETE_LEARN_WINDOW_S,
+    and reverse-geocoded positions (users' own locations) never are
+Every word start of an entry is indexed, so "liberty" finds
+"Newark Liberty International Airport". Matches on the entry's first word
+rank ahead of mid-entry matches, then by source (towns, landmarks, places,
+addresses).
+
+suggest() answers from the index; only when it has nothing for a prefix
+does the router fall through to Google Places Autocomplete. Either way the
+result is cached per normalized prefix for AUTOCOMPLETE_CACHE_TTL_S. A newly
+learned address drops only the cached prefixes it could match. At most
+AUTOCOMPLETE_MAX_ADDRESSES addresses are kept, oldest dropped first.
+"""
+
+import json
+import os
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from app.config import settings
+from app.services.ttl_cache import TTLCache
+
+_DEFAULT_PLACES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "nj_places.json"
+)
+
+# Rank bands by source; lower ranks sort first
+RANK_MUNICIPALITY = 0
+RANK_LANDMARK     = 10_000
+RANK_SAFE_PLACE   = 20_000
+RANK_ADDRESS      = 30_000
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    """Lower-case, punctuation folded to single spaces."""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def word_suffixes(key: str) -> list[str]:
+    """Every suffix of a normalized key that starts at a word."""
+    words = key.split(" ")
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._keys: list[tuple[str, int]] = []    # sorted (normalized suffix, entry id)
+        self._display: list[str] = []            # entry id → display text
+        self._norm: list[str] = []               # entry id → normalized display
+        self._rank: list[int] = []               # entry id → rank
+        self._seen: dict[str, int] = {}          # normalized entry → entry id
+        self._free: list[int] = []               # entry ids of removed entries, reused first
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def add(self, display: str, rank: int) -> bool:
+        """Index an entry under every word start; False if already present."""
+        key = normalize(display)
+        if not key or key in self._seen:
+            return False
+        if self._free:
+            entry = self._free.pop()
+            self._display[entry], self._norm[entry], self._rank[entry] = display, key, rank
+        else:
+            entry = len(self._display)
+            self._display.append(display)
+            self._norm.append(key)
+            self._rank.append(rank)
+        self._seen[key] = entry
+        for suffix in word_suffixes(key):
+            insort(self._keys, (suffix, entry))
+        return True
+
+    def remove(self, display: str) -> bool:
+        """Drop an entry and all its keys; False if it isn't indexed."""
+        key = normalize(display)
+        entry = self._seen.pop(key, None)
+        if entry is None:
+            return False
+        for suffix in word_suffixes(key):
+            i = bisect_left(self._keys, (suffix, entry))
+            if i < len(self._keys) and self._keys[i] == (suffix, entry):
+                del self._keys[i]
+        self._free.append(entry)
+        return True
+
+    def search(self, prefix: str, limit: int) -> list[str]:
+        p = normalize(prefix)
+        if not p:
+            return []
+        lo = bisect_left(self._keys, (p, -1))
+        hi = bisect_left(self._keys, (p + "\uffff", -1))
+
+        best: dict[int, tuple] = {}
+        for suffix, entry in self._keys[lo:hi]:
+            sort_key = (0 if suffix == self._norm[entry] else 1, self._rank[entry], self._display[entry])
+            if entry not in best or sort_key < best[entry]:
+                best[entry] = sort_key
+        return [self._display[e] for e in sorted(best, key=best.get)[:limit]]
+
+
+class PlaceSearch:
+    def __init__(self, places_path: str):
+        self.places_path = places_path
+        self._index: PrefixIndex | None = None
+        self._lock = threading.Lock()
+        self._addresses: OrderedDict[str, None] = OrderedDict()   # learned addresses, oldest first
+        self._lookups = TTLCache(        # address → geocode count within the learning window
+            default_ttl_s=settings.AUTOCOMPLETE_LEARN_WINDOW_S, max_entries=settings.AUTOCOMPLETE_MAX_ADDRESSES,
+        )
+        self._results = TTLCache(
+            default_ttl_s=settings.AUTOCOMPLETE_CACHE_TTL_S, max_entries=settings.AUTOCOMPLETE_CACHE_MAX,
+        )
+        self.local_hits = 0
+        self.misses = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._index is not None
+
+    def load(self) -> None:
+        """Build the index. Blocking (file reads); main.lifespan runs it in a thread."""
+        with self._lock:
+            if self._index is not None:
+                return
+            from app.services.safe_places import safe_places
+
+            index = PrefixIndex()
+            with open(self.places_path) as f:
+                raw = json.load(f)
+            for i, name in enumerate(raw.get("municipalities", [])):
+                index.add(name, RANK_MUNICIPALITY + i)
+            for i, name in enumerate(raw.get("landmarks", [])):
+                index.add(name, RANK_LANDMARK + i)
+            for place in safe_places.places():
+                label = f"{place['name']}, {place['vicinity']}" if place.get("vicinity") else place["name"]
+                index.add(label, RANK_SAFE_PLACE)
+            self._index = index
+            print(f"[PlaceSearch] Indexed {len(index)} places")
+
+    def _learn(self, address: str) -> bool:
+        """Index an address, dropping the oldest learned one past the cap."""
+        if not self._index.add(address, RANK_ADDRESS):
+            return False
+        self._addresses[address] = None
+        if len(self._addresses) > settings.AUTOCOMPLETE_MAX_ADDRESSES:
+            oldest, _ = self._addresses.popitem(last=False)
+            self._index.remove(oldest)
+            self._invalidate(oldest)
+        return True
+
+    def _invalidate(self, address: str) -> None:
+        """Drop cached results for every prefix that could match the address."""
+        for suffix in word_suffixes(normalize(address)):
+            for n in range(1, len(suffix) + 1):
+                self._results.set(suffix[:n], None, ttl_s=0)
+
+    def note_geocoded(self, address: str) -> None:
+        """
+        Count a geocode of an address; once it is common enough (see module
+        docstring) it is learned and cached results for its prefixes dropped.
+        """
+        if not (settings.AUTOCOMPLETE_LEARN_ADDRESSES and address and self._index is not None):
+            return
+        count = self._lookups.get(address, 0) + 1
+        self._lookups.set(address, count)
+        if count >= settings.AUTOCOMPLETE_LEARN_MIN_LOOKUPS and self._learn(address):
+            self._invalidate(address)
+
+    def cached(self, prefix: str) -> list[str] | None:
+        return self._results.get(normalize(prefix))
+
+    def remember(self, prefix: str, suggestions: list[str]) -> None:
+        self._results.set(normalize(prefix), suggestions)
+
+    def suggest(self, prefix: str, limit: int = 5) -> list[str]:
+        """Local suggestions, cached per prefix if any; [] means fall through to Google."""
+        found = self._index.search(prefix, limit) if self._index is not None else []
+        if found:
+            self.local_hits += 1
+            self.remember(prefix, found)
+        else:
+            self.misses += 1
+        return found
+
+    def stats(self) -> dict:
+        return {
+            "entries":      len(self._index) if self._index is not None else None,
+            "addresses":    len(self._addresses),
+            "local_hits":   self.local_hits,
+            "misses":       self.misses,
+            "prefix_cache": self._results.stats(),
+        }
+
+
+place_search = PlaceSearch(settings.AUTOCOMPLETE_PLACES_PATH or _DEFAULT_PLACES_PATH)
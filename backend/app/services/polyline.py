@@ -0,0 +1,128 @@
+"""
+Vectorized Google encoded-polyline decoding and fixed-interval resampling.
+
+Route scoring used to sample one point per Directions step, so a 15-mile
+highway step got a single sample at its on-ramp. Instead, the step
+polylines (falling back to the route's overview polyline) are decoded
+into one vertex array and resampled every ROUTE_SAMPLE_INTERVAL_M along
+the path, so risk is scored along the whole route.
+
+Everything here is numpy: decoding works on the raw bytes (5-bit chunks →
+reduceat per value → zig-zag → cumsum), and resampling is a searchsorted
+over cumulative haversine distance, so thousands of samples cost less
+than the old per-step Python loop. encode() turns locally computed routes
+(road_graph.py) back into polylines.
+"""
+
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_000.0
+
+
+def decode(encoded: str, precision: int = 5) -> np.ndarray:
+    """Decode an encoded polyline to an (n, 2) float64 array of (lat, lng)."""
+    if not encoded:
+        return np.empty((0, 2))
+    chunks = np.frombuffer(encoded.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+    ends = chunks < 0x20                         # last chunk of each value
+    n_values = int(ends.sum())
+    if n_values < 2:
+        return np.empty((0, 2))
+
+    starts = np.flatnonzero(np.concatenate(([True], ends[:-1])))[:n_values]
+    value_of = np.cumsum(np.concatenate(([0], ends[:-1])))
+    shift = 5 * (np.arange(len(chunks)) - starts[np.minimum(value_of, n_values - 1)])
+    # 5-bit groups never overlap, so summing is the same as OR-ing them
+    raw = np.add.reduceat((chunks & 0x1F) << np.clip(shift, 0, 60), starts)
+    deltas = np.where(raw & 1, ~(raw >> 1), raw >> 1)
+
+    deltas = deltas[: n_values - n_values % 2].reshape(-1, 2)
+    return np.cumsum(deltas, axis=0) / 10.0 ** precision
+
+
+def encode(coords: np.ndarray, precision: int = 5) -> str:
+    """Encode an (n, 2) array of (lat, lng) as a polyline string."""
+    if not len(coords):
+        return ""
+    ints = np.round(np.asarray(coords, dtype=np.float64) * 10.0 ** precision).astype(np.int64)
+    deltas = np.diff(ints, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    shifts = 5 * np.arange(7)                    # 7 chunks cover any 32-bit value
+    n_chunks = 1 + ((values[:, None] >> shifts[1:]) > 0).sum(axis=1)
+    pos = np.arange(7)
+    chars = ((values[:, None] >> shifts) & 0x1F) | np.where(pos < (n_chunks - 1)[:, None], 0x20, 0)
+    return (chars[pos < n_chunks[:, None]] + 63).astype(np.uint8).tobytes().decode("ascii")
+
+
+def decode_steps(raw_steps: list, overview: str | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Full path geometry for a Directions leg: (coords (n, 2), step index per
+    vertex). Uses each step's own polyline (more detailed than the overview),
+    its start/end locations if it has none, and the overview polyline —
+    attributed to step 0 — if no step geometry is available at all.
+    """
+    parts, owners = [], []
+    for i, s in enumerate(raw_steps):
+        coords = decode((s.get("polyline") or {}).get("points", ""))
+        if not len(coords):
+            ends = [s.get("start_location"), s.get("end_location")]
+            coords = np.array([[p["lat"], p["lng"]] for p in ends if p], dtype=np.float64).reshape(-1, 2)
+        parts.append(coords)
+        owners.append(np.full(len(coords), i, dtype=np.intp))
+
+    if not any(len(p) > 1 for p in parts) and overview:
+        coords = decode(overview)
+        return coords, np.zeros(len(coords), dtype=np.intp)
+    if not parts:
+        return np.empty((0, 2)), np.empty(0, dtype=np.intp)
+    return np.concatenate(parts), np.concatenate(owners)
+
+
+def haversine_m(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Great-circle distance in metres between arrays of points (degrees)."""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def segment_lengths(coords: np.ndarray) -> np.ndarray:
+    """Haversine length in metres of each consecutive vertex pair."""
+    return haversine_m(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+
+
+def resample(
+    coords: np.ndarray,
+    interval_m: float,
+    max_samples: int | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Points every interval_m along the path (plus its final vertex).
+
+    The interval is widened if needed so at most max_samples come back
+    (at least 2 — the path's endpoints — are always returned).
+    Returns (samples (m, 2), distance along the path in metres (m,),
+    index of the vertex each sample's segment starts at (m,)).
+    """
+    if len(coords) < 2:
+        return coords.copy(), np.zeros(len(coords)), np.zeros(len(coords), dtype=np.intp)
+
+    lengths = segment_lengths(coords)
+    cum = np.concatenate(([0.0], np.cumsum(lengths)))
+    total = cum[-1]
+    if max_samples and total / interval_m > max_samples - 1:
+        interval_m = total / max(max_samples - 1, 1)
+
+    dist = np.append(np.arange(0.0, total, interval_m), total)
+    seg = np.clip(np.searchsorted(cum, dist, side="right") - 1, 0, len(lengths) - 1)
+    frac = np.divide(dist - cum[seg], lengths[seg], out=np.zeros(len(dist)), where=lengths[seg] > 0)
+    samples = coords[seg] + np.clip(frac, 0.0, 1.0)[:, None] * (coords[seg + 1] - coords[seg])
+    return samples, dist, seg
+
+
+def runs(codes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(start, end) sample indices (end exclusive) of runs of equal codes."""
+    if not len(codes):
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1])))
+    return starts, np.append(starts[1:], len(codes))
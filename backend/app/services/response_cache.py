@@ -0,0 +1,202 @@
+"""
+Two-tier cache for Google Maps responses (geocode, reverse geocode,
+directions).
+
+Commuters send the same origin / destination pairs all day, and every
+/navigation/route call geocodes once and fetches directions twice. Each
+response kind gets its own ResponseCache:
+  - memory tier: a TTLCache (per-kind TTL, LRU-bounded)
+  - optional persistent tier: one SQLite file (GOOGLE_CACHE_DB_PATH) shared
+    by all kinds, so warm entries survive restarts. Expiry is stored as
+    wall-clock time; a persistent hit is promoted into memory for its
+    remaining lifetime. SQLite runs on its own worker thread (see
+    SqliteTier), so a lookup only awaits it on a memory miss.
+Keys are normalized by the callers (see routers/navigation.py) and must be
+JSON-serializable; so must values (tuples come back as lists).
+Errors are never cached — only successful lookups are stored.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Hashable
+
+from app.config import settings
+from app.services.ttl_cache import TTLCache
+
+_MISSING = object()
+
+
+class SqliteTier:
+    """
+    Persistent key/value tier with per-entry expiry, opened on first use.
+
+    Every SQLite call runs on one dedicated worker thread, never on the
+    event loop: reads are awaited, writes are queued and committed in
+    batches (one transaction per flush), and entry counts for /health are
+    refreshed in the background.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache")
+        self._lock = threading.Lock()
+        self._pending: list[tuple[str, str, float, str]] = []   # queued (kind, key, expires, value)
+        self._flush_queued = False
+        self._counts: dict[str, int] = {}
+        self._counting = False
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                " kind TEXT NOT NULL, key TEXT NOT NULL, expires REAL NOT NULL, value TEXT NOT NULL,"
+                " PRIMARY KEY (kind, key))"
+            )
+            conn.execute("DELETE FROM response_cache WHERE expires <= ?", (time.time(),))
+            self._conn = conn
+        return self._conn
+
+    def _get(self, kind: str, key: str) -> tuple[Any, float] | None:
+        row = self._db().execute(
+            "SELECT value, expires FROM response_cache WHERE kind = ? AND key = ?", (kind, key)
+        ).fetchone()
+        if row is None:
+            return None
+        ttl = row[1] - time.time()
+        if ttl <= 0:
+            self._db().execute("DELETE FROM response_cache WHERE kind = ? AND key = ?", (kind, key))
+            return None
+        return json.loads(row[0]), ttl
+
+    async def get(self, kind: str, key: str) -> tuple[Any, float] | None:
+        """(value, seconds left) or None if absent / expired."""
+        return await asyncio.get_running_loop().run_in_executor(self._worker, self._get, kind, key)
+
+    def set(self, kind: str, key: str, value: Any, ttl_s: float) -> None:
+        """Queue a write; it is committed with any others queued meanwhile."""
+        row = (kind, key, time.time() + ttl_s, json.dumps(value, separators=(",", ":")))
+        with self._lock:
+            self._pending.append(row)
+            if self._flush_queued:
+                return
+            self._flush_queued = True
+        self._worker.submit(self._flush)
+
+    def _flush(self) -> None:
+        with self._lock:
+            rows, self._pending, self._flush_queued = self._pending, [], False
+        if not rows:
+            return
+        try:
+            db = self._db()
+            db.execute("BEGIN")
+            db.executemany(
+                "INSERT OR REPLACE INTO response_cache (kind, key, expires, value) VALUES (?, ?, ?, ?)", rows,
+            )
+            db.execute("COMMIT")
+        except sqlite3.Error as e:
+            print(f"[ResponseCache] Write of {len(rows)} entries failed — {e}")
+            if self._conn is not None and self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+
+    def _refresh_counts(self) -> None:
+        try:
+            rows = self._db().execute(
+                "SELECT kind, COUNT(*) FROM response_cache WHERE expires > ? GROUP BY kind", (time.time(),)
+            ).fetchall()
+            self._counts = dict(rows)
+        except sqlite3.Error as e:
+            print(f"[ResponseCache] Count failed — {e}")
+        finally:
+            self._counting = False
+
+    def count(self, kind: str) -> int | None:
+        """Entries of a kind as of the last background count (None before the first)."""
+        if not self._counting:
+            self._counting = True
+            self._worker.submit(self._refresh_counts)
+        return self._counts.get(kind)
+
+    def close(self) -> None:
+        def close_db():
+            self._flush()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        self._worker.submit(close_db).result()
+        self._worker.shutdown()
+
+
+class ResponseCache:
+    def __init__(self, kind: str, ttl_s: float, max_entries: int, tier: SqliteTier | None = None):
+        self.kind = kind
+        self.ttl_s = ttl_s
+        self.memory = TTLCache(default_ttl_s=ttl_s, max_entries=max_entries)
+        self.tier = tier
+        self.persistent_hits = 0
+
+    async def get(self, key: Hashable) -> Any:
+        """Cached value, or None on a miss in both tiers."""
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.tier is None or self.ttl_s <= 0:
+            return None
+        try:
+            found = await self.tier.get(self.kind, json.dumps(key))
+        except sqlite3.Error as e:
+            print(f"[ResponseCache] {self.kind} read failed — {e}")
+            return None
+        if found is None:
+            return None
+        value, ttl = found
+        self.memory.set(key, value, ttl_s=ttl)
+        self.persistent_hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl_s <= 0:
+            return
+        self.memory.set(key, value)
+        if self.tier is not None:
+            self.tier.set(self.kind, json.dumps(key), value, self.ttl_s)
+
+    def stats(self) -> dict:
+        stats = {**self.memory.stats(), "ttl_s": self.ttl_s, "persistent_hits": self.persistent_hits}
+        if self.tier is not None:
+            stats["persistent_entries"] = self.tier.count(self.kind)
+        return stats
+
+
+google_tier = SqliteTier(settings.GOOGLE_CACHE_DB_PATH) if settings.GOOGLE_CACHE_DB_PATH else None
+
+geocode_cache = ResponseCache(
+    "geocode", settings.GEOCODE_CACHE_TTL_S, settings.GOOGLE_CACHE_MAX_ENTRIES, google_tier,
+)
+reverse_geocode_cache = ResponseCache(
+    "reverse_geocode", settings.REVERSE_GEOCODE_CACHE_TTL_S, settings.GOOGLE_CACHE_MAX_ENTRIES, google_tier,
+)
+directions_cache = ResponseCache(
+    "directions", settings.DIRECTIONS_CACHE_TTL_S, settings.GOOGLE_CACHE_MAX_ENTRIES, google_tier,
+)
+
+_CACHES = (geocode_cache, reverse_geocode_cache, directions_cache)
+
+
+def response_cache_stats() -> dict:
+    return {c.kind: c.stats() for c in _CACHES}
+
+
+def close_response_caches() -> None:
+    if google_tier is not None:
+        google_tier.close()
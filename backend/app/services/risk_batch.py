@@ -0,0 +1,148 @@
+"""
+Batch flood-risk scoring for many points at once.
+
+assess_points() is the shared path behind POST /flood/risk/batch and
+route scoring. Upstream data is fetched once per unique key, not per point:
+  - USGS: keyed by nearest gauge site (one bulk spatial-index lookup)
+  - NWS:  keyed by NWS grid cell (points resolve from the permanent grid
+          cache; one forecast per unique cell)
+All unique lookups are fired in parallel, then every point is scored in a
+single assess_many pass on the inference executor.
+
+Callers scoring several related batches at once (e.g. the candidate routes
+of one navigation request) pass a shared FetchCache, so a gauge, grid cell
+or forecast is fetched once across all of them, even while the batches
+are in flight concurrently.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.services.executors import inference_executor
+from app.services.flood_ml import flood_model
+from app.services.nws_service import FALLBACK_PRECIP, get_grid_forecast, resolve_grid
+from app.services.usgs_service import closest_gauges, get_stream_gauge_data
+
+
+class FetchCache:
+    """Request-scoped memo of upstream lookups: one task per key, shared by all awaiters."""
+
+    def __init__(self):
+        self._tasks: dict[Hashable, asyncio.Future] = {}
+
+    def fetch(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Awaitable[Any]:
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(factory())
+        # Shielded: one cancelled caller must not cancel the lookup for the rest
+        return asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+
+async def assess_points(
+    lats: list[float],
+    lngs: list[float],
+    month: int,
+    cache: FetchCache | None = None,
+    grid_snap_deg: float = 0.0,
+) -> dict:
+    """
+    Score every (lat, lng) with deduplicated upstream fetches (shared
+    with other calls through `cache`, if given).
+
+    grid_snap_deg > 0 snaps points to that lattice before resolving their
+    NWS grid cell, so densely sampled paths (see polyline.py) make one
+    /points lookup per lattice cell instead of one per ~110 m.
+
+    Returns assess_many's columnar arrays (risk_score, risk_level,
+    is_flood_zone) plus:
+        sites        — unique IDs of the gauges actually used (a lookup may
+                       fall back past a silent nearest gauge; None for the
+                       fallback defaults)
+        site_index   — per point, index into sites / gauges
+        gauges       — gauge dict per entry of sites (see get_stream_gauge_data)
+        precip       — precip dict per point (see get_grid_forecast)
+        unique_cells — number of distinct NWS grid cells fetched
+        usgs_live / nws_live — whether any live data was used
+    """
+    point_sites = closest_gauges(lats, lngs).tolist()
+    sites: dict[str, int] = {}                          # site_id → index
+    representative: list[tuple[float, float]] = []      # first point seen per site
+    for lat, lng, site in zip(lats, lngs, point_sites):
+        if site not in sites:
+            sites[site] = len(sites)
+            representative.append((lat, lng))
+    site_index = [sites[s] for s in point_sites]
+
+    if cache is None:
+        cache = FetchCache()
+    if grid_snap_deg > 0:
+        grid_keys = [
+            (round(round(lat / grid_snap_deg) * grid_snap_deg, 6), round(round(lng / grid_snap_deg) * grid_snap_deg, 6))
+            for lat, lng in zip(lats, lngs)
+        ]
+    else:
+        grid_keys = list(zip(lats, lngs))
+    unique_keys = list(dict.fromkeys(grid_keys))
+    key_cells = await asyncio.gather(*[
+        cache.fetch(("grid", lat, lng), lambda lat=lat, lng=lng: resolve_grid(lat, lng))
+        for lat, lng in unique_keys
+    ])
+    cell_of = dict(zip(unique_keys, key_cells))
+    point_cells = [cell_of[k] for k in grid_keys]
+    unique_cells = [c for c in dict.fromkeys(key_cells) if c is not None]
+
+    results = await asyncio.gather(
+        *[cache.fetch(("gauge", site), lambda ll=ll: get_stream_gauge_data(*ll))
+          for site, ll in zip(sites, representative)],
+        *[cache.fetch(("forecast", cell), lambda cell=cell: get_grid_forecast(cell))
+          for cell in unique_cells],
+    )
+    forecasts = dict(zip(unique_cells, results[len(sites):]))
+
+    # Re-key by the gauge each lookup returned: nearest sites that fell back
+    # to the same working gauge share one entry
+    used: dict[str | None, int] = {}
+    gauges: list[dict] = []
+    remap: list[int] = []
+    for g in results[:len(sites)]:
+        if g["site"] not in used:
+            used[g["site"]] = len(gauges)
+            gauges.append(g)
+        remap.append(used[g["site"]])
+    site_index = [remap[i] for i in site_index]
+
+    point_gauges = [gauges[i] for i in site_index]
+    precip       = [forecasts.get(cell, FALLBACK_PRECIP) for cell in point_cells]
+    batch = await inference_executor.run(
+        flood_model.assess_many,
+        lats=lats,
+        lngs=lngs,
+        stream_gauge_heights=[g["gauge_height_ft"] for g in point_gauges],
+        gauge_change_rates=[g["change_rate_ft_per_hr"] for g in point_gauges],
+        precip_prob_1hr=[p["precip_prob_1hr_pct"] for p in precip],
+        precip_prob_6hr=[p["precip_prob_6hr_pct"] for p in precip],
+        month=month,
+        flood_stage_ft=[g["flood_stage_ft"] for g in point_gauges],
+    )
+    return {
+        **batch,
+        "sites":        list(used),
+        "site_index":   site_index,
+        "gauges":       gauges,
+        "precip":       precip,
+        "unique_cells": len(unique_cells),
+        "usgs_live":    any(g.get("site_name", "") != "NJ gauge (fallback)" for g in gauges),
+        "nws_live":     any(f.get("source") == "NWS" for f in forecasts.values()),
+    }
+
+
+def confidence(usgs_live: bool, nws_live: bool) -> str:
+    """High with both live sources, Medium with one, Low with neither."""
+    if usgs_live and nws_live:
+        return "High"
+    if usgs_live or nws_live:
+        return "Medium"
+    return "Low"
@@ -0,0 +1,79 @@
+"""
+In-process pub/sub for live risk updates, streamed as Server-Sent Events.
+
+risk_hub.publish() is called whenever the statewide risk grid's content
+changes (see risk_grid.py). Subscribers don't poll: each open stream awaits
+the hub's current generation Event, so an idle connection is one parked
+coroutine and a publish wakes every waiter at once. On wake-up a stream
+re-evaluates its own state (levels at its points, or level counts in its
+bbox) with a cheap grid lookup and sends an event only if that state
+actually changed. Comment-line keepalives go out every
+RISK_STREAM_KEEPALIVE_S so proxies don't reap idle streams.
+"""
+
+import asyncio
+import json
+from typing import AsyncIterator, Callable
+
+from app.config import settings
+
+
+class RiskHub:
+    def __init__(self):
+        self.generation = 0
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+
+    def publish(self) -> None:
+        """Wake every subscriber; they re-check their own state."""
+        self.generation += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self, seen: int, timeout: float) -> bool:
+        """Wait for a generation newer than `seen`. False on timeout."""
+        if self.generation != seen:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self) -> dict:
+        return {"subscribers": self.subscribers, "generation": self.generation}
+
+
+risk_hub = RiskHub()
+
+
+def sse_event(event: str, data: dict, event_id: str | None = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def subscription_stream(state: Callable[[], tuple[str, dict] | None]) -> AsyncIterator[str]:
+    """
+    SSE body for one subscriber. `state()` returns (event_id, payload) for
+    the current grid, or None while the grid isn't ready; an event is sent
+    whenever the payload differs from the last one sent.
+    """
+    risk_hub.subscribers += 1
+    try:
+        yield f"retry: {int(settings.RISK_STREAM_RETRY_MS)}\n\n"
+        last = None
+        seen = -1
+        while True:
+            if not await risk_hub.wait(seen, settings.RISK_STREAM_KEEPALIVE_S):
+                yield ": keepalive\n\n"
+                continue
+            seen = risk_hub.generation
+            current = state()
+            if current is not None and current[1] != last:
+                event_id, last = current
+                yield sse_event("risk", last, event_id)
+    finally:
+        risk_hub.subscribers -= 1
@@ -0,0 +1,260 @@
+"""
+Precomputed statewide flood-risk raster, served as slippy-map tiles.
+
+A regular lat/lng grid over New Jersey (RISK_GRID_RES_DEG cells, default
+0.005° ≈ 500 m, ~170k cells) holds one risk level per cell. Each cell's
+inputs are:
+  - gauge height / rate of its nearest gauge, from the statewide USGS
+    snapshot
+  - NWS precipitation forecast at the centre of its forecast-lattice cell
+    (RISK_GRID_FORECAST_DEG, default 0.1° ≈ 10 km; NWS grid cells are
+    2.5 km, but the forecast is smooth at this scale and a coarser lattice
+    keeps a refresh to a few hundred NWS lookups, most of them cached)
+  - FEMA flood-zone membership of the cell centre itself
+Nearest-gauge assignment, lattice cell and zone membership are static,
+computed once.
+
+run_risk_grid_refresher() checks the inputs every RISK_GRID_CHECK_INTERVAL_S
+and recomputes only when they changed (new gauge readings, new forecast,
+new month or model version). Cells share a few thousand distinct
+(gauge, lattice cell, in-zone) feature rows, so a recompute is one small
+model call plus a gather over the grid.
+
+render_tile() turns the grid into a 256×256 palette PNG (hand-rolled
+zlib + struct encoder, one byte per pixel) for Web-Mercator z/x/y.
+Tiles are cached per grid content hash; the same hash makes the ETag, so
+clients revalidate with If-None-Match and get 304s until a level changes.
+Every content change is also published to risk_hub (see risk_events.py).
+"""
+
+import asyncio
+import hashlib
+import math
+import struct
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+from app.config import settings
+from app.services.executors import inference_executor
+from app.services.flood_ml import flood_model, is_flood_zone_many, risk_level_codes
+from app.services.nws_service import get_precip_forecast
+from app.services.risk_events import risk_hub
+from app.services.ttl_cache import TTLCache
+from app.services.usgs_service import (
+    NJ_GAUGE_SITES, closest_gauges, get_stream_gauge_data, snapshot_age_s,
+)
+
+# south, west, north, east — New Jersey plus a small margin
+NJ_BOUNDS = (38.85, -75.60, 41.40, -73.85)
+
+TILE_SIZE = 256
+
+# Palette index = 1 + risk level code; 0 = outside the grid / no data.
+# Colours follow the frontend's green / yellow / orange / red scale.
+_PALETTE = bytes([
+    0,   0,   0,
+    34,  197, 94,      # low
+    234, 179, 8,       # moderate
+    249, 115, 22,      # high
+    239, 68,  68,      # severe
+])
+_ALPHA = bytes([0, 70, 120, 150, 180])
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+
+def encode_png(pixels: np.ndarray) -> bytes:
+    """8-bit palette PNG from a 2-D uint8 array of palette indices."""
+    h, w = pixels.shape
+    raw = np.zeros((h, w + 1), dtype=np.uint8)      # leading 0 = filter "None" per scanline
+    raw[:, 1:] = pixels
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 3, 0, 0, 0)),
+        _png_chunk(b"PLTE", _PALETTE),
+        _png_chunk(b"tRNS", _ALPHA),
+        _png_chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)),
+        _png_chunk(b"IEND", b""),
+    ])
+
+
+class RiskGrid:
+    def __init__(self, res_deg: float):
+        south, west, north, east = NJ_BOUNDS
+        self.res = res_deg
+        self.south, self.west = south, west
+        self.n_rows = int(math.ceil((north - south) / res_deg))
+        self.n_cols = int(math.ceil((east - west) / res_deg))
+
+        self.pixels: np.ndarray | None = None       # (n_rows, n_cols) palette index, row 0 = south
+        self.etag: str | None = None                # content hash of pixels
+        self.snapshot: tuple[np.ndarray, str] | None = None   # (pixels, etag), swapped as one for worker threads
+        self.updated_at: datetime | None = None
+
+        self._sites = list(NJ_GAUGE_SITES)
+        self._cell_row: np.ndarray | None = None    # (n_rows, n_cols) index into the feature rows
+        self._cell_zone: np.ndarray | None = None   # (n_rows, n_cols) bool
+        self._row_gauge: np.ndarray | None = None   # feature row → index into _sites
+        self._row_forecast: np.ndarray | None = None   # feature row → index into _forecast_coords
+        self._forecast_coords: list[tuple[float, float]] = []   # lattice cell centres in use
+        self._fingerprint: tuple | None = None
+        self._tiles = TTLCache(default_ttl_s=math.inf, max_entries=settings.RISK_TILE_CACHE_MAX)
+
+    @property
+    def ready(self) -> bool:
+        return self.pixels is not None
+
+    def _prepare(self) -> None:
+        """Static per-cell inputs: nearest gauge, forecast-lattice cell, flood-zone membership."""
+        lats = self.south + (np.arange(self.n_rows) + 0.5) * self.res
+        lngs = self.west + (np.arange(self.n_cols) + 0.5) * self.res
+        cell_lats, cell_lngs = (a.ravel() for a in np.meshgrid(lats, lngs, indexing="ij"))
+
+        site_pos = {site: i for i, site in enumerate(self._sites)}
+        nearest, inverse = np.unique(closest_gauges(cell_lats, cell_lngs), return_inverse=True)
+        gauge_idx = np.array([site_pos[s] for s in nearest])[inverse]
+
+        step = settings.RISK_GRID_FORECAST_DEG
+        lattice_col = np.floor((cell_lngs - self.west) / step).astype(np.intp)
+        lattice_cols = int(lattice_col.max()) + 1
+        lattice = np.floor((cell_lats - self.south) / step).astype(np.intp) * lattice_cols + lattice_col
+        n_lattice = int(lattice.max()) + 1
+
+        # One feature row per (gauge, lattice cell) pair that actually occurs
+        pairs, cell_row = np.unique(gauge_idx * n_lattice + lattice, return_inverse=True)
+        used, self._row_forecast = np.unique(pairs % n_lattice, return_inverse=True)
+        self._row_gauge = pairs // n_lattice
+        self._forecast_coords = [
+            (self.south + (i // lattice_cols + 0.5) * step, self.west + (i % lattice_cols + 0.5) * step)
+            for i in used.tolist()
+        ]
+
+        shape = (self.n_rows, self.n_cols)
+        self._cell_row = cell_row.reshape(shape)
+        self._cell_zone = is_flood_zone_many(cell_lats, cell_lngs).reshape(shape)
+        print(
+            f"[RiskGrid] Prepared {self.n_rows}×{self.n_cols} grid at {self.res}° — "
+            f"{len(pairs)} feature rows, {len(used)} forecast points"
+        )
+
+    async def refresh(self) -> bool:
+        """Recompute the grid if its inputs changed. Returns True if recomputed."""
+        if snapshot_age_s() is None:
+            return False        # wait for the first USGS snapshot
+        if self._cell_row is None:
+            await asyncio.to_thread(self._prepare)
+
+        coords = [NJ_GAUGE_SITES[s]["coords"] for s in self._sites]
+        gauges = await asyncio.gather(*[get_stream_gauge_data(lat, lng) for lat, lng in coords])
+        # Lattice points sharing an NWS grid cell share one forecast (see
+        # nws_service); offshore points resolve once, then stay cached as None
+        limit = asyncio.Semaphore(settings.RISK_GRID_NWS_CONCURRENCY)
+
+        async def forecast(lat: float, lng: float) -> dict:
+            async with limit:
+                return await get_precip_forecast(lat, lng)
+
+        precips = await asyncio.gather(*[forecast(lat, lng) for lat, lng in self._forecast_coords])
+        month = datetime.utcnow().month
+
+        fingerprint = (
+            tuple((g["gauge_height_ft"], g["change_rate_ft_per_hr"], g["flood_stage_ft"]) for g in gauges),
+            tuple((p["precip_prob_1hr_pct"], p["precip_prob_6hr_pct"]) for p in precips),
+            month,
+            flood_model.status()["version"],
+        )
+        if fingerprint == self._fingerprint:
+            return False
+
+        # One model row per (gauge, lattice cell, in-zone) — cells just gather from it
+        n = len(self._row_gauge)
+        gauge_rows = np.tile(self._row_gauge, 2).tolist()
+        forecast_rows = np.tile(self._row_forecast, 2).tolist()
+        zone_rows = np.repeat([False, True], n)
+        batch = await inference_executor.run(
+            flood_model.assess_many,
+            lats=[self._forecast_coords[f][0] for f in forecast_rows],
+            lngs=[self._forecast_coords[f][1] for f in forecast_rows],
+            stream_gauge_heights=[gauges[g]["gauge_height_ft"] for g in gauge_rows],
+            gauge_change_rates=[gauges[g]["change_rate_ft_per_hr"] for g in gauge_rows],
+            precip_prob_1hr=[precips[f]["precip_prob_1hr_pct"] for f in forecast_rows],
+            precip_prob_6hr=[precips[f]["precip_prob_6hr_pct"] for f in forecast_rows],
+            month=month,
+            flood_stage_ft=[gauges[g]["flood_stage_ft"] for g in gauge_rows],
+            in_zone=zone_rows,
+        )
+        row_pixel = (1 + risk_level_codes(batch["risk_score"])).astype(np.uint8)
+        pixels = row_pixel[self._cell_row + n * self._cell_zone]
+
+        etag = hashlib.blake2b(pixels.tobytes(), digest_size=8).hexdigest()
+        self._fingerprint = fingerprint
+        self.updated_at = datetime.utcnow()
+        if etag != self.etag:
+            self.pixels, self.etag = pixels, etag
+            self.snapshot = (pixels, etag)
+            risk_hub.publish()
+        return True
+
+    def _cells(self, lats, lngs) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(rows, cols, inside-grid mask) for arrays of lat/lng."""
+        rows = np.floor((np.asarray(lats, dtype=np.float64) - self.south) / self.res).astype(np.intp)
+        cols = np.floor((np.asarray(lngs, dtype=np.float64) - self.west) / self.res).astype(np.intp)
+        inside = (rows >= 0) & (rows < self.n_rows) & (cols >= 0) & (cols < self.n_cols)
+        return rows, cols, inside
+
+    def level_codes_at(self, lats, lngs, pixels: np.ndarray | None = None) -> np.ndarray:
+        """Risk level code per point (0 low … 3 severe); -1 outside the grid."""
+        pixels = self.pixels if pixels is None else pixels
+        rows, cols, inside = self._cells(lats, lngs)
+        codes = np.full(len(rows), -1, dtype=np.int8)
+        codes[inside] = pixels[rows[inside], cols[inside]].astype(np.int8) - 1
+        return codes
+
+    def level_counts_in(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """Number of grid cells at each risk level (low … severe) inside a bbox."""
+        (r0, r1), (c0, c1), _ = self._cells([south, north], [west, east])
+        window = self.pixels[max(r0, 0):max(r1 + 1, 0), max(c0, 0):max(c1 + 1, 0)]
+        return np.bincount(window.ravel(), minlength=5)[1:]
+
+    def render_tile(self, z: int, x: int, y: int) -> bytes:
+        """PNG for Web-Mercator tile z/x/y (cached per grid content)."""
+        key = (self.etag, z, x, y)
+        cached = self._tiles.get(key)
+        if cached is not None:
+            return cached
+
+        pixels = self.pixels
+        scale = 2 ** z
+        offsets = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+        lngs = (x + offsets) / scale * 360.0 - 180.0
+        lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / scale))))
+
+        rows = np.floor((lats - self.south) / self.res).astype(np.intp)
+        cols = np.floor((lngs - self.west) / self.res).astype(np.intp)
+        row_ok = (rows >= 0) & (rows < self.n_rows)
+        col_ok = (cols >= 0) & (cols < self.n_cols)
+
+        tile = np.zeros((TILE_SIZE, TILE_SIZE), dtype=np.uint8)
+        if row_ok.any() and col_ok.any():
+            tile[np.ix_(row_ok, col_ok)] = pixels[np.ix_(rows[row_ok], cols[col_ok])]
+        png = encode_png(tile)
+        self._tiles.set(key, png)
+        return png
+
+
+risk_grid = RiskGrid(settings.RISK_GRID_RES_DEG)
+
+
+async def run_risk_grid_refresher() -> None:
+    """Keep risk_grid current, checking inputs every RISK_GRID_CHECK_INTERVAL_S."""
+    while True:
+        try:
+            if await risk_grid.refresh():
+                print(f"[RiskGrid] Recomputed — etag {risk_grid.etag}")
+        except Exception as e:
+            print(f"[RiskGrid] Refresh failed — {type(e).__name__}: {e}")
+        await asyncio.sleep(settings.RISK_GRID_CHECK_INTERVAL_S)
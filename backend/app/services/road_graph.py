@@ -0,0 +1,412 @@
+"""
+Offline flood-aware routing over a local road graph.
+
+Google Directions picks routes without knowing about flooding; choosing
+the safest of its few alternatives is all "flood avoidance" could mean.
+This module routes locally instead, with no network access:
+
+  build (offline CLI):
+    python -m app.services.road_graph build nj.osm --out road_graph.npz
+    streams an OSM XML extract, keeps drivable ways (oneway-aware, speed
+    from maxspeed or the highway class), keeps the largest strongly
+    connected component and writes a CSR graph (indptr / indices / edge
+    length / edge travel time) plus ALT landmark tables to one .npz:
+    ROAD_GRAPH_LANDMARKS landmarks picked by farthest-point selection, with
+    travel times from and to every node (scipy csgraph Dijkstra).
+
+  query (RoadGraph.route):
+    A* from the snapped origin to the snapped destination. Edge cost is
+    travel time × a flood penalty for the risk level at the edge's
+    midpoint, read from the precomputed statewide risk grid (risk_grid.py,
+    i.e. current flood_model scores). Severe edges are closed outright when
+    avoiding floods; if that disconnects the trip, they are retried at
+    ROAD_PENALTY_SEVERE. Penalties are ≥ 1, so the landmark lower bounds
+    (computed on plain travel time) stay admissible. The heuristic uses the
+    ROAD_ALT_ACTIVE_LANDMARKS landmarks that bound the trip best and is
+    computed for all nodes in one numpy pass; the search loop reads
+    memoryviews of the CSR arrays.
+"""
+
+import argparse
+import heapq
+import math
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from array import array
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components, dijkstra
+
+from app.config import settings
+from app.services.geo_index import GeoIndex
+from app.services.polyline import encode, haversine_m, runs
+
+# Drivable OSM highway classes → default speed (km/h) when maxspeed is absent
+HIGHWAY_SPEEDS_KMH = {
+    "motorway": 105, "motorway_link": 60,
+    "trunk": 90, "trunk_link": 50,
+    "primary": 70, "primary_link": 45,
+    "secondary": 60, "secondary_link": 40,
+    "tertiary": 50, "tertiary_link": 35,
+    "unclassified": 40, "residential": 35,
+    "living_street": 15, "service": 20,
+}
+
+ARRAY_NAMES = ("lat", "lng", "indptr", "indices", "length_m", "time_s", "lm_from", "lm_to")
+
+_MAXSPEED_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(mph)?")
+_LEVELS = ("low", "moderate", "high", "severe")
+
+
+class RouteNotFoundError(Exception):
+    pass
+
+
+def _speed_kmh(tags: dict) -> float:
+    match = _MAXSPEED_RE.match(tags.get("maxspeed", ""))
+    if match:
+        speed = float(match.group(1))
+        return speed * 1.609344 if match.group(2) else speed
+    return float(HIGHWAY_SPEEDS_KMH[tags["highway"]])
+
+
+def _oneway(tags: dict) -> int:
+    """1 forward only, -1 reverse only, 0 both directions."""
+    value = tags.get("oneway", "")
+    if value in ("yes", "true", "1"):
+        return 1
+    if value == "-1":
+        return -1
+    if value == "no":
+        return 0
+    return 1 if tags["highway"] == "motorway" or tags.get("junction") == "roundabout" else 0
+
+
+def parse_osm(path: str) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Stream an OSM XML file. Returns node ids (sorted), their lat / lng, and
+    directed edges as (from OSM id, to OSM id, speed km/h) arrays.
+    """
+    node_ids, node_lat, node_lng = array("q"), array("d"), array("d")
+    src, dst, speed = array("q"), array("q"), array("d")
+
+    for _, elem in ET.iterparse(path, events=("end",)):
+        if elem.tag == "node":
+            node_ids.append(int(elem.get("id")))
+            node_lat.append(float(elem.get("lat")))
+            node_lng.append(float(elem.get("lon")))
+        elif elem.tag == "way":
+            tags = {t.get("k"): t.get("v") for t in elem.iter("tag")}
+            if tags.get("highway") in HIGHWAY_SPEEDS_KMH and tags.get("access") not in ("no", "private"):
+                refs = [int(nd.get("ref")) for nd in elem.iter("nd")]
+                kmh, direction = _speed_kmh(tags), _oneway(tags)
+                for a, b in zip(refs, refs[1:]):
+                    if direction >= 0:
+                        src.append(a); dst.append(b); speed.append(kmh)
+                    if direction <= 0:
+                        src.append(b); dst.append(a); speed.append(kmh)
+        else:
+            if elem.tag == "relation":
+                elem.clear()
+            continue
+        elem.clear()
+
+    ids = np.frombuffer(node_ids, dtype=np.int64)
+    order = np.argsort(ids)
+    return (
+        ids[order],
+        np.frombuffer(node_lat, dtype=np.float64)[order],
+        np.frombuffer(node_lng, dtype=np.float64)[order],
+        np.stack([np.frombuffer(src, dtype=np.int64), np.frombuffer(dst, dtype=np.int64)]),
+        np.frombuffer(speed, dtype=np.float64),
+    )
+
+
+def build_graph(osm_path: str, n_landmarks: int) -> dict[str, np.ndarray]:
+    ids, lat, lng, edges, speed = parse_osm(osm_path)
+    pos = np.searchsorted(ids, edges)
+    known = (pos < len(ids)).all(axis=0)
+    pos = np.minimum(pos, len(ids) - 1)
+    known &= (ids[pos] == edges).all(axis=0)
+    u, v, speed = pos[0][known], pos[1][known], speed[known]
+    keep = u != v
+    u, v, speed = u[keep], v[keep], speed[keep]
+
+    length = haversine_m(lat[u], lng[u], lat[v], lng[v])
+    travel = np.maximum(length / (speed / 3.6), 0.01)     # keep every edge > 0 for csgraph
+
+    # Largest strongly connected component, nodes renumbered compactly
+    n = len(ids)
+    graph = csr_matrix((travel, (u, v)), shape=(n, n))
+    _, labels = connected_components(graph, directed=True, connection="strong")
+    biggest = np.bincount(labels).argmax()
+    inside = labels == biggest
+    new_id = np.cumsum(inside) - 1
+    keep = inside[u] & inside[v]
+    u, v, length, travel = new_id[u[keep]], new_id[v[keep]], length[keep], travel[keep]
+    lat, lng = lat[inside], lng[inside]
+    n = len(lat)
+
+    # Parallel edges: keep the fastest
+    order = np.lexsort((travel, v, u))
+    u, v, length, travel = u[order], v[order], length[order], travel[order]
+    first = np.concatenate(([True], (u[1:] != u[:-1]) | (v[1:] != v[:-1])))
+    u, v, length, travel = u[first], v[first], length[first], travel[first]
+
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(u, minlength=n)))).astype(np.int64)
+    graph = csr_matrix((travel, v, indptr), shape=(n, n))
+    lm_from, lm_to = _landmarks(graph, lat, lng, n_landmarks)
+    print(f"[RoadGraph] {n} nodes, {len(v)} edges, {len(lm_from)} landmarks")
+    return {
+        "lat": lat.astype(np.float64), "lng": lng.astype(np.float64),
+        "indptr": indptr, "indices": v.astype(np.int64),
+        "length_m": length.astype(np.float32), "time_s": travel.astype(np.float32),
+        "lm_from": lm_from, "lm_to": lm_to,
+    }
+
+
+def _landmarks(graph: csr_matrix, lat: np.ndarray, lng: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Farthest-point landmarks: travel times from (k, n) and to (k, n) each."""
+    # Start from the node farthest from the centroid, then repeatedly add
+    # the node farthest (by travel time) from every landmark chosen so far
+    start = int(np.argmax((lat - lat.mean()) ** 2 + (lng - lng.mean()) ** 2))
+    chosen, nearest = [start], None
+    reverse = graph.T.tocsr()
+    lm_from, lm_to = [], []
+    while True:
+        landmark = chosen[-1]
+        lm_from.append(dijkstra(graph, directed=True, indices=landmark))
+        lm_to.append(dijkstra(reverse, directed=True, indices=landmark))
+        d = np.minimum(lm_from[-1], lm_to[-1])
+        nearest = d if nearest is None else np.minimum(nearest, d)
+        if len(chosen) == k:
+            break
+        chosen.append(int(np.argmax(np.where(np.isfinite(nearest), nearest, -1))))
+    return np.array(lm_from, dtype=np.float32), np.array(lm_to, dtype=np.float32)
+
+
+def save_graph(arrays: dict[str, np.ndarray], path: str) -> None:
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+class RoadGraph:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._arrays: dict[str, np.ndarray] | None = None
+        self._nodes: GeoIndex | None = None
+        self._mid: tuple[np.ndarray, np.ndarray] | None = None
+        self._costs: dict[tuple, tuple[np.ndarray, np.ndarray, str | None]] = {}
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.path) and os.path.exists(self.path)
+
+    @property
+    def loaded(self) -> bool:
+        return self._arrays is not None
+
+    def load(self) -> None:
+        """Load the .npz (blocking; idempotent)."""
+        with self._lock:
+            if self._arrays is not None:
+                return
+            with np.load(self.path) as data:
+                arrays = {name: data[name] for name in ARRAY_NAMES}
+            lat, lng, indptr, indices = arrays["lat"], arrays["lng"], arrays["indptr"], arrays["indices"]
+            src = np.repeat(np.arange(len(lat)), np.diff(indptr))
+            self._mid = ((lat[src] + lat[indices]) / 2, (lng[src] + lng[indices]) / 2)
+            self._nodes = GeoIndex(lat, lng)
+            self._arrays = arrays
+            print(f"[RoadGraph] Loaded {len(lat)} nodes, {len(indices)} edges from {self.path}")
+
+    def status(self) -> dict | None:
+        if self._arrays is None:
+            return {"configured": self.configured, "loaded": False}
+        return {
+            "configured": True,
+            "loaded":     True,
+            "nodes":      len(self._arrays["lat"]),
+            "edges":      len(self._arrays["indices"]),
+            "landmarks":  len(self._arrays["lm_from"]),
+        }
+
+    def _edge_levels(self) -> tuple[np.ndarray, str | None]:
+        """Risk level code per edge (0 low … 3 severe) and the grid etag used."""
+        from app.services.risk_grid import risk_grid
+
+        # Pixels and etag are read as one pair; the grid may swap mid-route
+        snapshot = risk_grid.snapshot
+        if snapshot is None:
+            return np.zeros(len(self._arrays["indices"]), dtype=np.int8), None
+        pixels, etag = snapshot
+        codes = risk_grid.level_codes_at(*self._mid, pixels=pixels)
+        return np.maximum(codes, 0), etag
+
+    def _edge_costs(self, avoid_flood: bool, close_severe: bool) -> tuple[np.ndarray, np.ndarray, str | None]:
+        """(cost per edge, level per edge, grid etag) — cached per grid content."""
+        from app.services.risk_grid import risk_grid
+
+        # O(1) hit check; per-edge levels (O(E)) are only computed on a miss
+        snapshot = risk_grid.snapshot
+        etag = snapshot[1] if snapshot is not None else None
+        with self._lock:
+            cached = self._costs.get((etag, avoid_flood, close_severe))
+            if cached is None:
+                levels, etag = self._edge_levels()
+                key = (etag, avoid_flood, close_severe)
+                if avoid_flood:
+                    penalty = np.array([
+                        1.0,
+                        settings.ROAD_PENALTY_MODERATE,
+                        settings.ROAD_PENALTY_HIGH,
+                        math.inf if close_severe else settings.ROAD_PENALTY_SEVERE,
+                    ])
+                    costs = self._arrays["time_s"].astype(np.float64) * penalty[levels]
+                else:
+                    costs = self._arrays["time_s"].astype(np.float64)
+                cached = (costs, levels, etag)
+                self._costs = {k: v for k, v in self._costs.items() if k[0] == etag}
+                self._costs[key] = cached
+        return cached
+
+    def snap(self, lat: float, lng: float) -> tuple[int, float]:
+        """Nearest graph node and its distance in metres."""
+        dist_km, idx = self._nodes.nearest(lat, lng)
+        return int(idx[0]), float(dist_km[0]) * 1000
+
+    def _heuristic(self, source: int, target: int) -> np.ndarray:
+        """ALT lower bound on travel time to target, for every node."""
+        lm_from, lm_to = self._arrays["lm_from"], self._arrays["lm_to"]
+        with np.errstate(invalid="ignore"):
+            bound_at_source = np.maximum(lm_to[:, source] - lm_to[:, target], lm_from[:, target] - lm_from[:, source])
+        active = np.argsort(np.nan_to_num(-bound_at_source, nan=0.0))[:settings.ROAD_ALT_ACTIVE_LANDMARKS]
+
+        h = np.zeros(len(self._arrays["lat"]))
+        with np.errstate(invalid="ignore"):
+            for lm in active:
+                to, frm = lm_to[lm].astype(np.float64), lm_from[lm].astype(np.float64)
+                h = np.fmax(h, np.fmax(to - to[target], frm[target] - frm))
+        h[~np.isfinite(h)] = 0.0
+        return h
+
+    def _astar(self, source: int, target: int, costs: np.ndarray, h: np.ndarray) -> tuple[list[int], int]:
+        indptr = memoryview(self._arrays["indptr"])
+        indices = memoryview(self._arrays["indices"])
+        cost, hv = memoryview(costs), memoryview(h)
+
+        best = {source: 0.0}
+        parent = {source: -1}
+        heap = [(hv[source], 0.0, source)]
+        explored = 0
+        while heap:
+            _, g, u = heapq.heappop(heap)
+            if u == target:
+                break
+            if g > best[u]:
+                continue
+            explored += 1
+            for e in range(indptr[u], indptr[u + 1]):
+                c = cost[e]
+                if c == math.inf:
+                    continue
+                v, ng = indices[e], g + c
+                if ng < best.get(v, math.inf):
+                    best[v] = ng
+                    parent[v] = e
+                    heapq.heappush(heap, (ng + hv[v], ng, v))
+        else:
+            return [], explored
+
+        edges = []
+        node = target
+        while node != source:
+            e = parent[node]
+            edges.append(e)
+            node = self._source_of(e)
+        return edges[::-1], explored
+
+    def _source_of(self, edge: int) -> int:
+        return int(np.searchsorted(self._arrays["indptr"], edge, side="right") - 1)
+
+    def route(self, origin: tuple[float, float], destination: tuple[float, float], avoid_flood: bool = True) -> dict:
+        """
+        Fastest flood-penalized route between two points (blocking; run it
+        on the inference executor). Raises RouteNotFoundError.
+        """
+        self.load()
+        started = time.perf_counter()
+        source, source_snap = self.snap(*origin)
+        target, target_snap = self.snap(*destination)
+        if max(source_snap, target_snap) > settings.ROAD_GRAPH_MAX_SNAP_M:
+            raise RouteNotFoundError("Origin or destination is too far from the road network")
+
+        h = self._heuristic(source, target)
+        costs, levels, etag = self._edge_costs(avoid_flood, close_severe=True)
+        edges, explored = self._astar(source, target, costs, h)
+        if not edges and source != target and avoid_flood:
+            # Every way through crosses a severe cell — cross as little as possible
+            costs, levels, etag = self._edge_costs(avoid_flood, close_severe=False)
+            edges, more = self._astar(source, target, costs, h)
+            explored += more
+        if not edges and source != target:
+            raise RouteNotFoundError("No route between these points")
+
+        a = self._arrays
+        edge_idx = np.array(edges, dtype=np.intp)
+        nodes = np.concatenate(([source], a["indices"][edge_idx])).astype(np.intp)
+        coords = np.column_stack([a["lat"][nodes], a["lng"][nodes]])
+        lengths = a["length_m"][edge_idx].astype(np.float64)
+        cum = np.concatenate(([0.0], np.cumsum(lengths)))
+        edge_levels = levels[edge_idx]
+
+        segments = []
+        run_start, run_end = runs(edge_levels)
+        for s, e in zip(run_start.tolist(), run_end.tolist()):
+            segments.append({
+                "start_m":    round(float(cum[s]), 1),
+                "end_m":      round(float(cum[e]), 1),
+                "risk_level": _LEVELS[int(edge_levels[s])],
+                "risk_score": None,
+                "start_lat":  float(coords[s, 0]), "start_lng": float(coords[s, 1]),
+                "end_lat":    float(coords[e, 0]), "end_lng":   float(coords[e, 1]),
+            })
+
+        return {
+            "distance_m":     round(float(cum[-1]), 1),
+            "duration_s":     round(float(a["time_s"][edge_idx].astype(np.float64).sum()), 1),
+            "polyline":       encode(coords),
+            "risk_level":     _LEVELS[int(edge_levels.max())] if len(edge_levels) else "low",
+            "risk_segments":  segments,
+            "risk_aware":     etag is not None,
+            "nodes_explored": explored,
+            "compute_ms":     round((time.perf_counter() - started) * 1000, 2),
+        }
+
+
+road_graph = RoadGraph(settings.ROAD_GRAPH_PATH)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.services.road_graph")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    build = sub.add_parser("build", help="OSM XML extract → CSR graph + ALT landmarks (.npz)")
+    build.add_argument("osm")
+    build.add_argument("--out", default=settings.ROAD_GRAPH_PATH or "road_graph.npz")
+    build.add_argument("--landmarks", type=int, default=settings.ROAD_GRAPH_LANDMARKS)
+
+    args = parser.parse_args()
+    if args.cmd == "build":
+        save_graph(build_graph(args.osm, args.landmarks), args.out)
+        print(f"[RoadGraph] Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
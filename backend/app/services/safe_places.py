@@ -0,0 +1,291 @@
+"""
+Local index of NJ safe places (hospitals, shelters, police and fire
+stations, transit stations) for SafeZone lookups.
+
+During a real emergency SafeZone must not hinge on a Google Places round
+trip, so places live in a local JSON store (SAFE_PLACES_PATH, layered over
+the bundled app/data/nj_safe_places.json seed) as place_id → name,
+category, lat, lng, vicinity, source. The seed holds permanent facilities
+only (hospitals, police and fire stations): shelters open per event, so
+they come only from an `import` of an authoritative list or a live refresh. Each category gets its own GeoIndex, so
+nearest() is an in-memory k-NN query.
+
+Google Places is only a refresh source:
+  - `python -m app.services.safe_places refresh` sweeps the state and
+    upserts every result
+  - `python -m app.services.safe_places import FILE` upserts a CSV (name,
+    category, lat, lng[, vicinity]) or JSON export of another dataset
+  - when nothing of a category is indexed within range, SafeZone asks
+    Google once and upserts what comes back (see routers/navigation.py);
+    a refresh that adds nothing is remembered per ~10 km area and category
+    for SAFE_PLACES_EMPTY_TTL_S, so a sparse area doesn't hit Google on
+    every request
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+import threading
+
+from app.config import settings
+from app.services.circuit_breaker import breaker
+from app.services.geo_index import GeoIndex
+from app.services.http_client import GOOGLE, get_client
+from app.services.ttl_cache import TTLCache
+
+PLACES_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+
+# category → display label
+CATEGORY_LABELS = {
+    "hospital":        "Hospital",
+    "shelter":         "Emergency Shelter",
+    "police":          "Police Station",
+    "fire_station":    "Fire Station",
+    "transit_station": "Transit Station",
+}
+
+# How each category is searched on Google Places: Nearby Search type or keyword
+_PLACES_QUERY = {
+    "hospital":        {"type": "hospital"},
+    "shelter":         {"keyword": "emergency shelter"},
+    "police":          {"type": "police"},
+    "fire_station":    {"type": "fire_station"},
+    "transit_station": {"type": "transit_station"},
+}
+
+_DEFAULT_SEED_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "nj_safe_places.json"
+)
+
+
+class SafePlaceIndex:
+    def __init__(self, path: str, seed_path: str):
+        self.path = path
+        self.seed_path = seed_path
+        self._places: dict[str, dict] | None = None
+        self._indexes: dict[str, tuple[GeoIndex, list[str]]] = {}
+        self._generation = 0                       # bumped per change; newest write wins
+        self._written = 0
+        self._write_lock = threading.Lock()
+
+    def _load(self) -> dict[str, dict]:
+        if self._places is None:
+            # Seed first, store on top: seeds added after the store was
+            # written still show up, and stored edits win
+            self._places = {}
+            for path in (self.seed_path, self.path):
+                try:
+                    with open(path) as f:
+                        self._places.update(json.load(f))
+                except (OSError, ValueError):
+                    continue
+            self._rebuild()
+            print(f"[SafePlaces] Loaded {len(self._places)} places")
+        return self._places
+
+    def _rebuild(self) -> None:
+        by_category: dict[str, list[str]] = {}
+        for place_id, p in self._places.items():
+            by_category.setdefault(p["category"], []).append(place_id)
+        self._indexes = {
+            category: (
+                GeoIndex([self._places[i]["lat"] for i in ids], [self._places[i]["lng"] for i in ids]),
+                ids,
+            )
+            for category, ids in by_category.items()
+        }
+
+    def _write(self, places: dict[str, dict], generation: int) -> None:
+        with self._write_lock:
+            if generation <= self._written:
+                return          # a newer snapshot is already on disk
+            tmp = f"{self.path}.tmp"
+            try:
+                with open(tmp, "w") as f:
+                    json.dump(places, f)
+                os.replace(tmp, self.path)
+                self._written = generation
+            except OSError as e:
+                print(f"[SafePlaces] Could not persist index — {e}")
+
+    def save(self) -> None:
+        self._write(dict(self._load()), self._generation)
+
+    async def save_async(self) -> None:
+        """save() with the file write in a worker thread (copy taken on the loop)."""
+        await asyncio.to_thread(self._write, dict(self._load()), self._generation)
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def places(self) -> list[dict]:
+        return list(self._load().values())
+
+    def counts(self) -> dict[str, int]:
+        self._load()
+        return {category: len(ids) for category, (_, ids) in self._indexes.items()}
+
+    def nearest(self, lat: float, lng: float, category: str, k: int = 1, max_km: float | None = None) -> list[dict]:
+        """Up to k places of a category, closest first, each with distance_km."""
+        self._load()
+        if category not in self._indexes:
+            return []
+        index, ids = self._indexes[category]
+        dist, idx = index.nearest(lat, lng, k)
+        return [
+            {"place_id": ids[i], **self._places[ids[i]], "distance_km": float(d)}
+            for d, i in zip(dist.tolist(), idx.tolist())
+            if max_km is None or d <= max_km
+        ]
+
+    def upsert(self, places: list[dict]) -> int:
+        """
+        Insert or update places (each with place_id) in memory; returns how
+        many changed. Callers persist with save() / save_async().
+        """
+        current = self._load()
+        changed = 0
+        for p in places:
+            place_id = p["place_id"]
+            record = {k: p[k] for k in ("name", "category", "lat", "lng", "vicinity", "source")}
+            if current.get(place_id) != record:
+                current[place_id] = record
+                changed += 1
+        if changed:
+            self._generation += 1
+            self._rebuild()
+        return changed
+
+
+safe_places = SafePlaceIndex(settings.SAFE_PLACES_PATH, settings.SAFE_PLACES_SEED_PATH or _DEFAULT_SEED_PATH)
+
+
+async def fetch_places(lat: float, lng: float, category: str, radius_m: int = 20000) -> list[dict]:
+    """Google Places Nearby results for a category, as upsert-ready places."""
+    params = {
+        "location": f"{lat},{lng}",
+        "radius":   radius_m,
+        "key":      settings.GOOGLE_MAPS_API_KEY,
+        **_PLACES_QUERY[category],
+    }
+    async with breaker("google_places"):
+        resp = await get_client(GOOGLE).get(PLACES_URL, params=params)
+        resp.raise_for_status()
+
+    places = []
+    for p in resp.json().get("results", []):
+        loc = p.get("geometry", {}).get("location", {})
+        if p.get("place_id") is None or loc.get("lat") is None or loc.get("lng") is None:
+            continue
+        places.append({
+            "place_id": p["place_id"],
+            "name":     p.get("name", "Unknown"),
+            "category": category,
+            "lat":      float(loc["lat"]),
+            "lng":      float(loc["lng"]),
+            "vicinity": p.get("vicinity", ""),
+            "source":   "google",
+        })
+    return places
+
+
+# (lat, lng rounded to 0.1°, category) of recent refreshes that added nothing
+_empty_refreshes = TTLCache(default_ttl_s=settings.SAFE_PLACES_EMPTY_TTL_S, max_entries=4096)
+
+
+async def refresh_near(lat: float, lng: float, category: str, radius_m: int = 20000) -> int:
+    """Upsert Google's places of a category around a point; 0 on any failure."""
+    area = (round(lat, 1), round(lng, 1), category)
+    if _empty_refreshes.get(area):
+        return 0
+    try:
+        changed = safe_places.upsert(await fetch_places(lat, lng, category, radius_m))
+    except Exception as e:
+        print(f"[SafePlaces] Refresh near {lat:.3f},{lng:.3f} ({category}) failed — {type(e).__name__}: {e}")
+        return 0
+    if changed:
+        await safe_places.save_async()
+    else:
+        _empty_refreshes.set(area, True)
+    return changed
+
+
+def load_file(path: str) -> list[dict]:
+    """Places from a CSV (name, category, lat, lng[, vicinity]) or JSON list / dict."""
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path) as f:
+            raw = json.load(f)
+        rows = [{"place_id": k, **v} for k, v in raw.items()] if isinstance(raw, dict) else raw
+
+    places = []
+    for row in rows:
+        category = row["category"].strip().lower()
+        if category not in CATEGORY_LABELS:
+            raise ValueError(f"Unknown category {row['category']!r} (expected one of {', '.join(CATEGORY_LABELS)})")
+        slug = re.sub(r"[^a-z0-9]+", "-", row["name"].lower()).strip("-")
+        places.append({
+            "place_id": row.get("place_id") or f"import:{category}:{slug}",
+            "name":     row["name"].strip(),
+            "category": category,
+            "lat":      float(row["lat"]),
+            "lng":      float(row["lng"]),
+            "vicinity": (row.get("vicinity") or "").strip(),
+            "source":   row.get("source") or "import",
+        })
+    return places
+
+
+async def _sweep(categories: list[str], step_deg: float) -> None:
+    from app.services.http_client import close_clients, init_clients
+    from app.services.risk_grid import NJ_BOUNDS
+
+    south, west, north, east = NJ_BOUNDS
+    await init_clients()
+    try:
+        lat = south
+        while lat <= north:
+            lng = west
+            while lng <= east:
+                for category in categories:
+                    changed = await refresh_near(lat, lng, category)
+                    if changed:
+                        print(f"[SafePlaces] {lat:.2f},{lng:.2f} {category}: {changed} upserted")
+                lng += step_deg
+            lat += step_deg
+    finally:
+        await close_clients()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.services.safe_places")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    imp = sub.add_parser("import", help="upsert places from a CSV or JSON file")
+    imp.add_argument("file")
+
+    ref = sub.add_parser("refresh", help="sweep NJ with Google Places and upsert the results")
+    ref.add_argument("--category", action="append", choices=list(CATEGORY_LABELS),
+                     help="category to refresh (repeatable; default: all)")
+    ref.add_argument("--step-deg", type=float, default=0.15, help="sweep lattice spacing (~15 km)")
+
+    sub.add_parser("stats", help="places indexed per category")
+
+    args = parser.parse_args()
+    if args.cmd == "import":
+        print(f"{safe_places.upsert(load_file(args.file))} places upserted")
+        safe_places.save()
+    elif args.cmd == "refresh":
+        if not settings.GOOGLE_MAPS_API_KEY:
+            parser.error("GOOGLE_MAPS_API_KEY is not configured")
+        asyncio.run(_sweep(args.category or list(CATEGORY_LABELS), args.step_deg))
+    print(json.dumps(safe_places.counts(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Single-flight request coalescing.
+
+When many coroutines ask for the same upstream resource at the same moment
+(500 map clients missing the cache at once during a storm), only the first
+caller actually runs the fetch; everyone else with the same key awaits that
+one shared in-flight task and receives its result — or its exception.
+
+The key is forgotten as soon as the fetch settles, so this only collapses
+*concurrent* calls; caching across time is the caller's job.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args) -> Any:
+        """Run fn(*args) once per key among concurrent callers and share the result."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        # Shield so one caller being cancelled doesn't cancel the fetch for the rest
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()   # mark retrieved even if every waiter was cancelled
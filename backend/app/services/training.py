@@ -0,0 +1,268 @@
+"""
+Flood-model training pipeline.
+
+Datasets live on disk as a directory holding X.npy (n, 6 features, float64)
+and y.npy (n risk scores), written chunk by chunk through np.memmap and read
+back memory-mapped, so row counts are bounded by disk, not RAM:
+
+    generate_dataset()  synthetic samples from the domain rules (same
+                        distribution and noise as flood_ml's training data)
+    ingest_csv()        stream a CSV of real samples (header row, the six
+                        feature columns in flood_ml order, then risk_score)
+
+search() trains a grid of candidates in parallel worker processes —
+GradientBoostingRegressor ("gbr", StandardScaler in front, as served
+today) and HistGradientBoostingRegressor ("hgb", histogram-binned and
+multithreaded, far faster on large sets). Each worker memory-maps the
+dataset itself; only file paths and results cross process boundaries.
+Every candidate reports holdout RMSE / MAE, training time, and TreeEnsemble
+inference latency at several batch sizes. The winner can be written
+straight into the artifact store.
+
+    cd backend
+    python -m app.services.training generate --rows 5000000 --out ./training_data
+    python -m app.services.training ingest events.csv --out ./training_data
+    python -m app.services.training search --data ./training_data --workers 8 --save
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from app.config import settings
+from app.services.flood_ml import rule_scores
+from app.services.model_store import activate, save_artifact
+from app.services.tree_ensemble import TreeEnsemble, export_ensemble, export_hist_ensemble
+
+N_FEATURES = 6
+DEFAULT_CHUNK_ROWS = 250_000
+BENCH_BATCH_SIZES = (1, 100, 10_000)
+
+# Default search grid. HGB max_leaf_nodes stays ≤ 64 (TreeEnsemble's limit).
+DEFAULT_GRID = [
+    {"estimator": "gbr", "n_estimators": 200, "max_depth": 4, "learning_rate": 0.05, "subsample": 0.8},
+    {"estimator": "gbr", "n_estimators": 300, "max_depth": 3, "learning_rate": 0.1, "subsample": 0.5},
+    {"estimator": "hgb", "max_iter": 200, "max_leaf_nodes": 31, "learning_rate": 0.1},
+    {"estimator": "hgb", "max_iter": 400, "max_leaf_nodes": 15, "learning_rate": 0.05},
+    {"estimator": "hgb", "max_iter": 300, "max_depth": 6, "learning_rate": 0.1, "l2_regularization": 1.0},
+]
+
+
+# ── Datasets ──────────────────────────────────────────────────────────────
+
+def _open_dataset(out_dir: str, n: int) -> tuple[np.memmap, np.memmap]:
+    os.makedirs(out_dir, exist_ok=True)
+    X = np.lib.format.open_memmap(os.path.join(out_dir, "X.npy"), mode="w+", dtype=np.float64, shape=(n, N_FEATURES))
+    y = np.lib.format.open_memmap(os.path.join(out_dir, "y.npy"), mode="w+", dtype=np.float64, shape=(n,))
+    return X, y
+
+
+def load_dataset(data_dir: str) -> tuple[np.ndarray, np.ndarray]:
+    """Memory-mapped (X, y) of a dataset directory."""
+    X = np.load(os.path.join(data_dir, "X.npy"), mmap_mode="r")
+    y = np.load(os.path.join(data_dir, "y.npy"), mmap_mode="r")
+    if X.shape != (len(y), N_FEATURES):
+        raise ValueError(f"{data_dir}: X {X.shape} does not match y {y.shape}")
+    return X, y
+
+
+def synthetic_chunk(n: int, seed) -> tuple[np.ndarray, np.ndarray]:
+    """n synthetic samples: flood_ml's feature ranges, rule labels + N(0, 1.5) noise."""
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.uniform(0.0, 1.6, n),                 # height / flood_stage
+        rng.uniform(-0.2, 2.0, n),                # ft/hr
+        rng.uniform(0, 100, n),                   # %
+        rng.uniform(0, 100, n),                   # %
+        rng.integers(0, 2, n).astype(float),      # in_zone
+        rng.integers(0, 2, n).astype(float),      # high_risk_month
+    ])
+    y = np.clip(rule_scores(X) + rng.normal(0, 1.5, n), 0, 80)
+    return X, y
+
+
+def generate_dataset(out_dir: str, rows: int, chunk_rows: int = DEFAULT_CHUNK_ROWS, seed: int = 42) -> str:
+    """Write `rows` synthetic samples chunk by chunk; each chunk has its own seed."""
+    X, y = _open_dataset(out_dir, rows)
+    for chunk, start in enumerate(range(0, rows, chunk_rows)):
+        stop = min(start + chunk_rows, rows)
+        X[start:stop], y[start:stop] = synthetic_chunk(stop - start, (seed, chunk))
+    X.flush()
+    y.flush()
+    print(f"[Training] Generated {rows:,} samples in {out_dir}")
+    return out_dir
+
+
+def ingest_csv(csv_path: str, out_dir: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> str:
+    """Stream a CSV (header + 6 feature columns + risk_score) into a dataset directory."""
+    with open(csv_path) as f:
+        rows = sum(1 for line in f if line.strip()) - 1
+    X, y = _open_dataset(out_dir, rows)
+    with open(csv_path) as f:
+        next(f)
+        lines = (line for line in f if line.strip())
+        start = 0
+        while start < rows:
+            block = np.loadtxt(itertools.islice(lines, chunk_rows), delimiter=",", ndmin=2)
+            stop = start + len(block)
+            X[start:stop], y[start:stop] = block[:, :N_FEATURES], block[:, N_FEATURES]
+            start = stop
+    X.flush()
+    y.flush()
+    print(f"[Training] Ingested {rows:,} samples from {csv_path} into {out_dir}")
+    return out_dir
+
+
+def _split(n: int, holdout: float, max_train_rows: int | None, seed: int = 0):
+    """Shuffled (train_idx, test_idx); train optionally subsampled."""
+    order = np.random.default_rng(seed).permutation(n)
+    n_test = max(1, int(n * holdout))
+    test_idx, train_idx = order[:n_test], order[n_test:]
+    if max_train_rows and len(train_idx) > max_train_rows:
+        train_idx = train_idx[:max_train_rows]
+    return np.sort(train_idx), np.sort(test_idx)
+
+
+# ── Candidates ────────────────────────────────────────────────────────────
+
+def fit_candidate(params: dict, X: np.ndarray, y: np.ndarray) -> dict[str, np.ndarray]:
+    """Fit one candidate config and return its exported ensemble arrays."""
+    params = dict(params)
+    estimator = params.pop("estimator")
+    if estimator == "gbr":
+        from sklearn.ensemble import GradientBoostingRegressor
+        from sklearn.preprocessing import StandardScaler
+
+        # Scaler statistics are accumulated chunk by chunk
+        scaler = StandardScaler()
+        for start in range(0, len(X), DEFAULT_CHUNK_ROWS):
+            scaler.partial_fit(X[start:start + DEFAULT_CHUNK_ROWS])
+        model = GradientBoostingRegressor(random_state=42, **params)
+        model.fit(scaler.transform(X), y)
+        return export_ensemble(model, scaler)
+    if estimator == "hgb":
+        from sklearn.ensemble import HistGradientBoostingRegressor
+
+        model = HistGradientBoostingRegressor(random_state=42, **params)
+        model.fit(X, y)
+        return export_hist_ensemble(model)
+    raise ValueError(f"unknown estimator: {estimator}")
+
+
+def benchmark_inference(ensemble: TreeEnsemble, X: np.ndarray, repeats: int = 20) -> dict:
+    """Median TreeEnsemble.predict latency (µs per call) at BENCH_BATCH_SIZES."""
+    out = {}
+    for batch in BENCH_BATCH_SIZES:
+        rows = np.ascontiguousarray(X[:batch])
+        reps = repeats if batch <= 100 else max(3, repeats // 4)
+        timings = []
+        for _ in range(reps):
+            start = time.perf_counter()
+            ensemble.predict(rows)
+            timings.append(time.perf_counter() - start)
+        out[f"predict_us_batch_{batch}"] = round(float(np.median(timings)) * 1e6, 1)
+    return out
+
+
+def _run_candidate(params: dict, data_dir: str, holdout: float, max_train_rows: int | None,
+                   threads: int) -> dict:
+    """Worker-process entry: train, score holdout, benchmark. Returns a result row."""
+    from threadpoolctl import threadpool_limits
+
+    X, y = load_dataset(data_dir)
+    train_idx, test_idx = _split(len(y), holdout, max_train_rows)
+    with threadpool_limits(threads):
+        start = time.perf_counter()
+        arrays = fit_candidate(params, X[train_idx], y[train_idx])
+        train_s = time.perf_counter() - start
+
+    ensemble = TreeEnsemble(arrays)
+    X_test, y_test = X[test_idx], y[test_idx]
+    err = np.clip(ensemble.predict(X_test), 0, 80) - y_test
+    return {
+        "params": params,
+        "train_rows": len(train_idx),
+        "train_s": round(train_s, 2),
+        "rmse": round(float(np.sqrt(np.mean(err ** 2))), 4),
+        "mae": round(float(np.mean(np.abs(err))), 4),
+        "n_trees": ensemble.n_trees,
+        **benchmark_inference(ensemble, X_test),
+        "arrays": arrays,
+    }
+
+
+def search(data_dir: str, grid: list[dict] | None = None, workers: int | None = None,
+           holdout: float = 0.2, max_train_rows: int | None = None) -> list[dict]:
+    """
+    Train every grid candidate in a process pool; results sorted best (lowest
+    holdout RMSE) first. Each worker gets an equal share of the cores for
+    its BLAS / OpenMP threads.
+    """
+    grid = grid or DEFAULT_GRID
+    workers = workers or min(len(grid), os.cpu_count() or 1)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"[Training] Searching {len(grid)} candidates on {workers} workers × {threads} threads")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_candidate, p, data_dir, holdout, max_train_rows, threads) for p in grid]
+        for future in as_completed(futures):
+            r = future.result()
+            print(f"[Training] {json.dumps(r['params'])}: rmse={r['rmse']} "
+                  f"train={r['train_s']}s predict(1)={r['predict_us_batch_1']}µs")
+            results.append(r)
+    return sorted(results, key=lambda r: r["rmse"])
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.services.training")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="write a synthetic dataset")
+    gen.add_argument("--rows", type=int, default=1_000_000)
+    gen.add_argument("--out", required=True)
+    gen.add_argument("--seed", type=int, default=42)
+
+    ing = sub.add_parser("ingest", help="convert a CSV of labelled samples into a dataset")
+    ing.add_argument("csv")
+    ing.add_argument("--out", required=True)
+
+    srch = sub.add_parser("search", help="parallel hyperparameter search")
+    srch.add_argument("--data", required=True)
+    srch.add_argument("--grid", help="JSON file with a list of candidate param dicts")
+    srch.add_argument("--workers", type=int)
+    srch.add_argument("--holdout", type=float, default=0.2)
+    srch.add_argument("--max-train-rows", type=int)
+    srch.add_argument("--save", action="store_true", help="save the best candidate to the artifact store")
+    srch.add_argument("--activate", action="store_true", help="also point CURRENT at it")
+    srch.add_argument("--dir", default=settings.MODEL_ARTIFACT_DIR, help="artifact directory")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        generate_dataset(args.out, args.rows, seed=args.seed)
+    elif args.command == "ingest":
+        ingest_csv(args.csv, args.out)
+    elif args.command == "search":
+        grid = None
+        if args.grid:
+            with open(args.grid) as f:
+                grid = json.load(f)
+        results = search(args.data, grid, args.workers, args.holdout, args.max_train_rows)
+        print(json.dumps([{k: v for k, v in r.items() if k != "arrays"} for r in results], indent=2))
+        if args.save:
+            best = results[0]
+            os.makedirs(args.dir, exist_ok=True)
+            meta = {k: v for k, v in best.items() if k != "arrays"}
+            version = save_artifact(args.dir, best["arrays"], meta)
+            if args.activate:
+                activate(args.dir, version)
+            print(f"[Training] Saved best candidate as {version}" + (" (active)" if args.activate else ""))
+
+
+if __name__ == "__main__":
+    _cli()
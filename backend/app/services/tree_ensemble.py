@@ -0,0 +1,227 @@
+"""
+Sklearn-free evaluator for the flood-risk gradient-boosted tree models.
+
+export_ensemble() flattens a fitted GBR and its StandardScaler into a few
+contiguous numpy arrays — every tree's nodes concatenated into one table of
+(feature, threshold, left, right, value) — and TreeEnsemble evaluates them
+for a whole batch without walking trees node by node.
+export_hist_ensemble() does the same for a HistGradientBoostingRegressor
+(no scaler; its leaves already include the learning rate).
+
+Evaluation uses the QuickScorer bitvector scheme: number each tree's leaves
+left to right; a split whose test fails (x > threshold) rules out every
+leaf in its left subtree. Sorting all splits on a feature by threshold, the
+failed splits for a value x are exactly a prefix of that order, so the
+running AND of "surviving leaves" masks can be precomputed per prefix.
+Per batch that leaves one searchsorted per feature, a row gather + AND per
+feature, and taking the lowest surviving leaf of every tree.
+
+Predictions match sklearn bit for bit: inputs are scaled with the same
+(X - mean) / scale, compared against thresholds as float32 for GBR trees
+and float64 for HGB predictors (as sklearn's tree code does), and tree
+contributions are accumulated stage by stage in the same order, starting
+from the model's constant init / baseline prediction.
+
+Only export_ensemble touches sklearn objects; serving needs just numpy.
+"""
+
+import numpy as np
+
+# Array names in an exported ensemble (also the .npy file names on disk)
+ARRAY_NAMES = (
+    "feature", "threshold", "left", "right", "value",
+    "roots", "init", "learning_rate", "max_depth",
+    "scaler_mean", "scaler_scale",
+)
+# Optional arrays; absent → default behaviour
+#   split_float32 : [1] compare features as float32 (GBR, default), [0] as float64 (HGB)
+OPTIONAL_ARRAY_NAMES = ("split_float32",)
+
+# Widest per-tree leaf bitmask TreeEnsemble supports
+MAX_LEAVES = 64
+
+
+def export_ensemble(model, scaler) -> dict[str, np.ndarray]:
+    """Flatten a fitted GradientBoostingRegressor + StandardScaler into arrays."""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for stage in model.estimators_:
+        tree = stage[0].tree_
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        own = np.arange(offset, offset + n)
+
+        # Leaves point at themselves (left == right == own index) with an
+        # always-true split, so a leaf is recognisable and traversal-safe.
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, own, tree.children_left + offset))
+        rights.append(np.where(is_leaf, own, tree.children_right + offset))
+        values.append(tree.value.reshape(n))
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += n
+
+    init = model.init_.predict(np.zeros((1, model.n_features_in_)))
+    _check_leaves(lefts, roots)
+    return {
+        "feature":       np.concatenate(features).astype(np.intp),
+        "threshold":     np.concatenate(thresholds).astype(np.float64),
+        "left":          np.concatenate(lefts).astype(np.intp),
+        "right":         np.concatenate(rights).astype(np.intp),
+        "value":         np.concatenate(values).astype(np.float64),
+        "roots":         np.array(roots, dtype=np.intp),
+        "init":          np.array([init.ravel()[0]], dtype=np.float64),
+        "learning_rate": np.array([model.learning_rate], dtype=np.float64),
+        "max_depth":     np.array([max_depth], dtype=np.intp),
+        "scaler_mean":   np.asarray(scaler.mean_, dtype=np.float64),
+        "scaler_scale":  np.asarray(scaler.scale_, dtype=np.float64),
+    }
+
+
+def export_hist_ensemble(model) -> dict[str, np.ndarray]:
+    """Flatten a fitted HistGradientBoostingRegressor into arrays (identity scaler)."""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for stage in model._predictors:
+        nodes = stage[0].nodes
+        if nodes["is_categorical"].any():
+            raise ValueError("categorical splits are not supported")
+        n = len(nodes)
+        is_leaf = nodes["is_leaf"].astype(bool)
+        own = np.arange(offset, offset + n)
+
+        features.append(np.where(is_leaf, 0, nodes["feature_idx"]))
+        thresholds.append(np.where(is_leaf, np.inf, nodes["num_threshold"]))
+        lefts.append(np.where(is_leaf, own, nodes["left"].astype(np.intp) + offset))
+        rights.append(np.where(is_leaf, own, nodes["right"].astype(np.intp) + offset))
+        values.append(nodes["value"])
+        roots.append(offset)
+        max_depth = max(max_depth, int(nodes["depth"].max()))
+        offset += n
+
+    _check_leaves(lefts, roots)
+    n_features = model.n_features_in_
+    return {
+        "feature":       np.concatenate(features).astype(np.intp),
+        "threshold":     np.concatenate(thresholds).astype(np.float64),
+        "left":          np.concatenate(lefts).astype(np.intp),
+        "right":         np.concatenate(rights).astype(np.intp),
+        "value":         np.concatenate(values).astype(np.float64),
+        "roots":         np.array(roots, dtype=np.intp),
+        "init":          np.array([np.ravel(model._baseline_prediction)[0]], dtype=np.float64),
+        "learning_rate": np.array([1.0]),     # HGB leaf values are already shrunk
+        "max_depth":     np.array([max_depth], dtype=np.intp),
+        "scaler_mean":   np.zeros(n_features),
+        "scaler_scale":  np.ones(n_features),
+        "split_float32": np.array([0], dtype=np.int8),
+    }
+
+
+def _check_leaves(lefts: list[np.ndarray], roots: list[int]) -> None:
+    for left, root in zip(lefts, roots):
+        n_leaves = int(np.count_nonzero(left == np.arange(root, root + len(left))))
+        if n_leaves > MAX_LEAVES:
+            raise ValueError(f"tree with {n_leaves} leaves exceeds the {MAX_LEAVES}-leaf limit")
+
+
+class TreeEnsemble:
+    """Batch evaluator over exported ensemble arrays (see export_ensemble)."""
+
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        self.arrays = arrays
+        self._init  = float(arrays["init"][0])
+        self._lr    = float(arrays["learning_rate"][0])
+        self._mean  = arrays["scaler_mean"]
+        self._scale = arrays["scaler_scale"]
+        self._split_dtype = np.float32 if int(arrays.get("split_float32", [1])[0]) else np.float64
+        self._build_tables()
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.arrays["roots"])
+
+    def _build_tables(self) -> None:
+        """Derive per-feature prefix-AND leaf masks and the leaf value table."""
+        feature, threshold = self.arrays["feature"], self.arrays["threshold"]
+        left, right, value = self.arrays["left"], self.arrays["right"], self.arrays["value"]
+        n_features = len(self._mean)
+
+        leaf_values: list[list[float]] = []
+        splits: list[tuple[int, float, int, int]] = []   # (feature, threshold, tree, left-subtree leaf mask)
+
+        for tree, root in enumerate(self.arrays["roots"]):
+            leaves: list[float] = []
+            stack = [(int(root), False)]
+            masks: dict[int, int] = {}
+            # Iterative post-order walk: leaves numbered left to right
+            while stack:
+                node, expanded = stack.pop()
+                if left[node] == node:
+                    masks[node] = 1 << len(leaves)
+                    leaves.append(float(value[node]))
+                elif not expanded:
+                    stack.append((node, True))
+                    stack.append((int(right[node]), False))
+                    stack.append((int(left[node]), False))
+                else:
+                    left_mask = masks[int(left[node])]
+                    masks[node] = left_mask | masks[int(right[node])]
+                    splits.append((int(feature[node]), float(threshold[node]), tree, left_mask))
+            leaf_values.append(leaves)
+
+        n_leaves = max(len(v) for v in leaf_values)
+        self._mask_dtype = next(
+            dt for dt in (np.uint8, np.uint16, np.uint32, np.uint64) if np.iinfo(dt).bits >= n_leaves
+        )
+        all_leaves = int(np.iinfo(self._mask_dtype).max)
+
+        self._leaf_values = np.zeros((self.n_trees, n_leaves))
+        for tree, leaves in enumerate(leaf_values):
+            self._leaf_values[tree, :len(leaves)] = leaves
+        self._leaf_offsets = np.arange(self.n_trees) * n_leaves
+
+        self._thresholds: list[np.ndarray] = []
+        self._prefix_masks: list[np.ndarray] = []
+        for f in range(n_features):
+            on_f = sorted((sp for sp in splits if sp[0] == f), key=lambda sp: sp[1])
+            masks = np.full((len(on_f) + 1, self.n_trees), all_leaves, dtype=self._mask_dtype)
+            for i, (_, _, tree, left_mask) in enumerate(on_f):
+                masks[i + 1, tree] = all_leaves & ~left_mask
+            self._thresholds.append(np.array([sp[1] for sp in on_f], dtype=np.float64))
+            self._prefix_masks.append(np.bitwise_and.accumulate(masks, axis=0))
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """StandardScaler.transform equivalent."""
+        X = np.array(X, dtype=np.float64)
+        X -= self._mean
+        X /= self._scale
+        return X
+
+    def predict_scaled(self, X_scaled: np.ndarray) -> np.ndarray:
+        """GradientBoostingRegressor.predict equivalent on already-scaled features."""
+        # Compare at the precision sklearn's tree code uses for this model
+        X = np.asarray(X_scaled, dtype=self._split_dtype).astype(np.float64)
+        n = len(X)
+
+        surviving = None
+        for f, (thresholds, prefix_masks) in enumerate(zip(self._thresholds, self._prefix_masks)):
+            failed = np.searchsorted(thresholds, X[:, f], side="left")   # splits with threshold < x
+            rows = prefix_masks[failed]
+            surviving = rows if surviving is None else surviving & rows
+
+        # Exit leaf = lowest surviving bit of each tree's mask
+        lowest = surviving & (~surviving + 1)
+        exit_leaf = np.frexp(lowest.astype(np.float64))[1] - 1
+
+        # Sequential stage-by-stage accumulation (cumsum is order-preserving)
+        contrib = np.empty((n, self.n_trees + 1))
+        contrib[:, 0] = self._init
+        np.multiply(self._lr, self._leaf_values.ravel()[self._leaf_offsets + exit_leaf], out=contrib[:, 1:])
+        return np.cumsum(contrib, axis=1)[:, -1]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Scale raw features, then predict."""
+        return self.predict_scaled(self.transform(X))
@@ -0,0 +1,60 @@
+"""
+Small in-memory TTL cache with per-entry expiry and LRU size bound.
+
+Used for upstream responses whose freshness is known (e.g. NWS forecasts,
+whose Cache-Control / Expires headers say how long they stay valid).
+Not thread-safe: callers that share one across threads lock around it
+(see risk_cache.py).
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, default_ttl_s: float, max_entries: int = 10_000):
+        self.default_ttl_s = default_ttl_s
+        self.max_entries = max_entries
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING or entry[0] <= time.monotonic():
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl_s: float | None = None) -> None:
+        ttl = self.default_ttl_s if ttl_s is None else ttl_s
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries":   len(self._data),
+            "hits":      self.hits,
+            "misses":    self.misses,
+            "evictions": self.evictions,
+        }
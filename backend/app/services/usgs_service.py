@@ -7,88 +7,87 @@ Gauge height parameter: 00065 (gage height, feet)
 Sentinel value -999999 means equipment malfunction — we skip those readings.
 """
 
-import httpx
-from datetime import datetime
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.config import settings
+from app.services.circuit_breaker import breaker
+from app.services.gauge_history import buffer_for, oldest_last_time
+from app.services.geo_index import GeoIndex
+from app.services.http_client import get_client, USGS
+from app.services.single_flight import SingleFlight
 
 USGS_IV_URL = "https://waterservices.usgs.gov/nwis/iv/"
 
-# Major NJ stream gauge sites with their USGS-published flood stages (feet).
+# NJ stream gauge registry, loaded from GAUGE_SITES_PATH (default: the
+# bundled app/data/nj_gauges.json) as site_id → name, lat, lng and the
+# USGS-published stages (feet):
 # action_ft = action stage (elevated monitoring)
 # flood_ft  = official flood stage (property/road flooding begins)
 # These come from USGS NWISWeb gauge pages for each site.
-NJ_GAUGE_SITES = {
-    "01389500": {
-        "name":       "Passaic River at Millington",
-        "coords":     (40.697, -74.519),
-        "action_ft":  8.0,
-        "flood_ft":   9.0,
-    },
-    "01389890": {
-        "name":       "Passaic River at Two Bridges",
-        "coords":     (40.894, -74.275),
-        "action_ft":  11.0,
-        "flood_ft":   16.0,
-    },
-    "01390500": {
-        "name":       "Passaic River at Little Falls",
-        "coords":     (40.877, -74.218),
-        "action_ft":  11.0,
-        "flood_ft":   14.0,
-    },
-    "01396500": {
-        "name":       "Raritan River at Manville",
-        "coords":     (40.554, -74.594),
-        "action_ft":  14.0,
-        "flood_ft":   22.0,
-    },
-    "01403060": {
-        "name":       "Raritan River at New Brunswick",
-        "coords":     (40.487, -74.447),
-        "action_ft":  13.0,
-        "flood_ft":   16.0,
-    },
-    "01408500": {
-        "name":       "Toms River near Toms River",
-        "coords":     (39.957, -74.197),
-        "action_ft":  5.5,
-        "flood_ft":   7.0,
-    },
-    "01377000": {
-        "name":       "Hackensack River at Rivervale",
-        "coords":     (41.018, -74.006),
-        "action_ft":  8.0,
-        "flood_ft":   10.0,
-    },
-    "01396660": {
-        "name":       "Green Brook at Bound Brook",
-        "coords":     (40.566, -74.534),
-        "action_ft":  4.0,
-        "flood_ft":   6.0,
-    },
-}
+_DEFAULT_GAUGE_SITES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "nj_gauges.json"
+)
+
+
+def _load_gauge_sites() -> dict[str, dict]:
+    with open(settings.GAUGE_SITES_PATH or _DEFAULT_GAUGE_SITES_PATH) as f:
+        raw = json.load(f)
+    return {
+        site: {
+            "name":      info["name"],
+            "coords":    (float(info["lat"]), float(info["lng"])),
+            "action_ft": float(info["action_ft"]),
+            "flood_ft":  float(info["flood_ft"]),
+        }
+        for site, info in raw.items()
+    }
+
+
+NJ_GAUGE_SITES = _load_gauge_sites()
+
+# Spatial index over the registry; row i ↔ _SITE_IDS[i]
+_SITE_IDS = np.array(list(NJ_GAUGE_SITES))
+_gauge_index = GeoIndex(
+    [info["coords"][0] for info in NJ_GAUGE_SITES.values()],
+    [info["coords"][1] for info in NJ_GAUGE_SITES.values()],
+)
 
 USGS_SENTINEL = -999999.0   # USGS "no data / equipment malfunction" value
 
+_inflight = SingleFlight()
+
+# Safe defaults returned when no gauge has valid data
+_FALLBACK_GAUGE = {
+    "site":                  None,
+    "gauge_height_ft":       5.0,
+    "change_rate_ft_per_hr": 0.0,
+    "site_name":             "NJ gauge (fallback)",
+    "action_stage_ft":       8.0,
+    "flood_stage_ft":        12.0,
+}
+
 
 def closest_gauge(lat: float, lng: float) -> str:
     """Return the site ID of the closest NJ gauge to the given coordinates."""
-    best_site = "01390500"
-    best_dist = float("inf")
-    for site, info in NJ_GAUGE_SITES.items():
-        glat, glng = info["coords"]
-        dist = (lat - glat) ** 2 + (lng - glng) ** 2
-        if dist < best_dist:
-            best_dist = dist
-            best_site = site
-    return best_site
+    _, idx = _gauge_index.nearest(lat, lng, k=1)
+    return str(_SITE_IDS[idx[0]])
+
+
+def closest_gauges(lats, lngs) -> np.ndarray:
+    """Vectorized closest_gauge: array of site IDs, one per (lat, lng) pair."""
+    _, idx = _gauge_index.nearest_many(lats, lngs, k=1)
+    return _SITE_IDS[idx[:, 0]]
 
 
-def _ordered_gauges(lat: float, lng: float) -> list[str]:
-    """Return all gauge site IDs sorted by distance (closest first)."""
-    def dist(site):
-        glat, glng = NJ_GAUGE_SITES[site]["coords"]
-        return (lat - glat) ** 2 + (lng - glng) ** 2
-    return sorted(NJ_GAUGE_SITES.keys(), key=dist)
+def _ordered_gauges(lat: float, lng: float, k: int | None = None) -> list[str]:
+    """Return the k (default: all) nearest gauge site IDs, closest first."""
+    _, idx = _gauge_index.nearest(lat, lng, k=k or len(_gauge_index))
+    return _SITE_IDS[idx].tolist()
 
 
 def _valid_values(raw_values: list) -> list:
@@ -107,11 +106,61 @@ def _valid_values(raw_values: list) -> list:
     return good
 
 
+def _parse_time(value: str) -> int | None:
+    """USGS dateTime (ISO-8601 with offset) → UTC epoch seconds."""
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except (ValueError, TypeError):
+        return None
+
+
+def _ingest(site: str, raw_values: list) -> dict | None:
+    """
+    Append a site's new raw USGS readings to its history buffer and return
+    the gauge dict served to callers, computed from that history.
+    Returns None if the gauge has no valid reading within GAUGE_STALE_AFTER_S.
+    """
+    times, heights = [], []
+    for height, stamp in _valid_values(raw_values):
+        t = _parse_time(stamp)
+        if t is not None:
+            times.append(t)
+            heights.append(height)
+
+    buf = buffer_for(site)
+    buf.extend(np.array(times, dtype=np.int64), np.array(heights, dtype=np.float32))
+
+    latest = buf.latest()
+    if latest is None:
+        return None   # gauge is broken / no valid data
+    latest_time, height = latest
+    if datetime.now(timezone.utc).timestamp() - latest_time > settings.GAUGE_STALE_AFTER_S:
+        return None   # gauge has stopped reporting
+
+    # Rate of change over the trailing window (default: last two 15-min readings)
+    change_rate = buf.rate_ft_per_hr(settings.GAUGE_RATE_WINDOW_S)
+
+    info = NJ_GAUGE_SITES[site]
+    return {
+        "site":                  site,
+        "gauge_height_ft":       round(height, 2),
+        "change_rate_ft_per_hr": round(change_rate, 3),
+        "site_name":             info["name"],
+        "action_stage_ft":       info["action_ft"],
+        "flood_stage_ft":        info["flood_ft"],
+    }
+
+
 async def _fetch_gauge(site: str) -> dict | None:
     """
     Fetch gauge height and change rate for one USGS site.
     Returns None if the gauge has no valid readings.
+    Concurrent calls for the same site share one request.
     """
+    return await _inflight.do(("gauge", site), _fetch_gauge_once, site)
+
+
+async def _fetch_gauge_once(site: str) -> dict | None:
     params = {
         "format":      "json",
         "sites":       site,
@@ -120,66 +169,217 @@ async def _fetch_gauge(site: str) -> dict | None:
         "period":      "PT3H",   # last 3 hours — enough for rate of change
     }
     try:
-        async with httpx.AsyncClient(timeout=8.0) as client:
-            resp = await client.get(USGS_IV_URL, params=params)
+        async with breaker("usgs"):
+            resp = await get_client(USGS).get(USGS_IV_URL, params=params)
             resp.raise_for_status()
         time_series = resp.json()["value"]["timeSeries"]
         if not time_series:
             return None
 
-        raw = time_series[0]["values"][0]["value"]
-        valid = _valid_values(raw)
-
-        if not valid:
-            return None   # gauge is broken / no valid data
-
-        height = valid[-1][0]
-
-        # Compute rate of change from last two valid readings
-        if len(valid) >= 2:
-            h2, t2 = valid[-1]
-            h1, t1 = valid[-2]
-            try:
-                fmt = "%Y-%m-%dT%H:%M:%S.%f%z"
-                dt1 = datetime.strptime(t1, fmt)
-                dt2 = datetime.strptime(t2, fmt)
-                hours = (dt2 - dt1).total_seconds() / 3600 or 0.25
-            except Exception:
-                hours = 0.25
-            change_rate = (h2 - h1) / hours
-        else:
-            change_rate = 0.0
-
-        info = NJ_GAUGE_SITES[site]
-        return {
-            "gauge_height_ft":       round(height, 2),
-            "change_rate_ft_per_hr": round(change_rate, 3),
-            "site_name":             info["name"],
-            "action_stage_ft":       info["action_ft"],
-            "flood_stage_ft":        info["flood_ft"],
-        }
+        return _ingest(site, time_series[0]["values"][0]["value"])
 
     except Exception:
         return None
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Statewide snapshot — one batched request for every site, refreshed on the
+# USGS update cadence by a background poller started in main.lifespan.
+# ─────────────────────────────────────────────────────────────────────────────
+
+_snapshot: dict[str, dict] = {}          # site_id → gauge dict (see _ingest)
+_snapshot_times: dict[str, int] = {}     # site_id → epoch seconds of that entry's reading
+_snapshot_updated_at: datetime | None = None
+
+
+async def refresh_snapshot() -> int:
+    """
+    Refresh the statewide snapshot (see _refresh_snapshot_once).
+    Concurrent calls share one batched request.
+    """
+    return await _inflight.do("snapshot", _refresh_snapshot_once)
+
+
+async def _refresh_snapshot_once() -> int:
+    """
+    Fetch every site in NJ_GAUGE_SITES with comma-separated `sites=`
+    requests (USGS_SITES_PER_REQUEST per request, fired in parallel — a
+    single request for the default catalog) and update the snapshot.
+
+    Once every site has history, only readings since the most out-of-date
+    site's newest reading are requested (a ~15-minute delta), but never from
+    further back than GAUGE_STALE_AFTER_S; the first call
+    seeds the buffers with GAUGE_HISTORY_SEED_PERIOD of history.
+    Sites whose newest valid reading is older than GAUGE_STALE_AFTER_S are
+    dropped from the snapshot. Returns the number of sites refreshed.
+    """
+    global _snapshot_updated_at
+
+    params = {
+        "format":      "json",
+        "parameterCd": "00065",
+        "siteType":    "ST",
+    }
+    since = oldest_last_time(NJ_GAUGE_SITES)
+    if since is None:
+        params["period"] = settings.GAUGE_HISTORY_SEED_PERIOD
+    else:
+        # A gauge silent for days must not drag every site's delta back with
+        # it: nothing older than GAUGE_STALE_AFTER_S could be served anyway
+        stale_cutoff = int(datetime.now(timezone.utc).timestamp() - settings.GAUGE_STALE_AFTER_S)
+        since = max(since, stale_cutoff)
+        params["startDT"] = datetime.fromtimestamp(since, timezone.utc).strftime("%Y-%m-%dT%H:%M%z")
+
+    sites = list(NJ_GAUGE_SITES)
+    step = settings.USGS_SITES_PER_REQUEST
+    batches = [sites[i:i + step] for i in range(0, len(sites), step)]
+
+    async def fetch(batch: list[str]) -> list:
+        async with breaker("usgs"):
+            resp = await get_client(USGS).get(USGS_IV_URL, params={**params, "sites": ",".join(batch)})
+            resp.raise_for_status()
+        return resp.json()["value"]["timeSeries"]
+
+    # One failed batch must not discard the others' readings; its sites keep
+    # their older last_time, so the next delta re-covers them
+    results = await asyncio.gather(*[fetch(b) for b in batches], return_exceptions=True)
+    failures = [r for r in results if isinstance(r, BaseException)]
+    if len(failures) == len(results):
+        raise failures[0]
+    for e in failures:
+        print(f"[USGS] Snapshot batch failed — {type(e).__name__}: {e}")
+
+    refreshed = 0
+    for time_series in results:
+        if isinstance(time_series, BaseException):
+            continue
+        for series in time_series:
+            site = series["sourceInfo"]["siteCode"][0]["value"]
+            if site not in NJ_GAUGE_SITES:
+                continue
+            summary = _ingest(site, series["values"][0]["value"])
+            if summary is not None:
+                _snapshot[site] = summary
+                _snapshot_times[site] = buffer_for(site).last_time
+                refreshed += 1
+            else:
+                _snapshot.pop(site, None)
+                _snapshot_times.pop(site, None)
+
+    _snapshot_updated_at = datetime.utcnow()
+    return refreshed
+
+
+async def run_gauge_poller() -> None:
+    """Refresh the statewide snapshot forever, every USGS_POLL_INTERVAL_S."""
+    while True:
+        try:
+            count = await refresh_snapshot()
+            print(f"[USGS] Snapshot refreshed — {count}/{len(NJ_GAUGE_SITES)} gauges live")
+        except Exception as e:
+            print(f"[USGS] Snapshot refresh failed — {type(e).__name__}: {e}")
+        await asyncio.sleep(settings.USGS_POLL_INTERVAL_S)
+
+
+def snapshot_age_s() -> float | None:
+    """Seconds since the last successful snapshot refresh, or None if never."""
+    if _snapshot_updated_at is None:
+        return None
+    return (datetime.utcnow() - _snapshot_updated_at).total_seconds()
+
+
 async def get_stream_gauge_data(lat: float, lng: float) -> dict:
     """
-    Fetch real-time gauge data for the nearest working NJ gauge.
+    Return real-time gauge data for the nearest working NJ gauge.
     Falls back to the next closest gauge if the nearest has no valid data.
-    Always returns a dict with gauge_height_ft, change_rate_ft_per_hr,
-    action_stage_ft, flood_stage_ft, site_name.
+    Always returns a dict with site (None for the fallback defaults),
+    gauge_height_ft, change_rate_ft_per_hr, action_stage_ft, flood_stage_ft,
+    site_name.
+
+    Served from the statewide snapshot with no network I/O. Snapshot
+    entries whose reading is older than GAUGE_STALE_AFTER_S are never
+    served (the poller may be failing); when no fresh entry is left — or
+    before the poller's first successful refresh — goes to USGS directly
+    (hedged, see _hedged_fetch).
     """
-    for site in _ordered_gauges(lat, lng):
-        result = await _fetch_gauge(site)
-        if result is not None:
-            return result
+    # O(log n): only the nearest few gauges, widened to the whole catalog
+    # only if none of them has a fresh snapshot entry
+    ordered = _ordered_gauges(lat, lng, settings.GAUGE_LOOKUP_K)
+    entry = _fresh_snapshot_entry(ordered)
+    if entry is None and _snapshot and len(ordered) < len(_gauge_index):
+        entry = _fresh_snapshot_entry(_ordered_gauges(lat, lng)[len(ordered):])
+    if entry is not None:
+        return entry
+
+    result = await _hedged_fetch(ordered[:settings.GAUGE_HEDGE_K])
+    if result is not None:
+        return result
 
     # All gauges unavailable — return safe defaults
-    return {
-        "gauge_height_ft":       5.0,
-        "change_rate_ft_per_hr": 0.0,
-        "site_name":             "NJ gauge (fallback)",
-        "action_stage_ft":       8.0,
-        "flood_stage_ft":        12.0,
-    }
+    return dict(_FALLBACK_GAUGE)
+
+
+def _fresh_snapshot_entry(sites: list[str]) -> dict | None:
+    """First snapshot entry among `sites` whose reading is within GAUGE_STALE_AFTER_S."""
+    oldest = datetime.now(timezone.utc).timestamp() - settings.GAUGE_STALE_AFTER_S
+    for site in sites:
+        entry = _snapshot.get(site)
+        if entry is not None and _snapshot_times.get(site, 0) >= oldest:
+            return entry
+    return None
+
+
+async def _hedged_fetch(sites: list[str]) -> dict | None:
+    """
+    Fetch the nearest valid gauge among `sites` (closest first) with hedging.
+
+    The nearest site is requested immediately; each further site starts
+    after GAUGE_HEDGE_DELAY_S, or at once if every request so far has come
+    back empty. The first result returned is the nearest valid one whose
+    nearer siblings have all settled. At GAUGE_DEADLINE_S the nearest valid
+    result in hand (or None) is returned. Outstanding requests are cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.GAUGE_DEADLINE_S
+    next_launch = loop.time()
+    tasks: list[asyncio.Task] = []
+
+    def nearest_settled() -> tuple[dict | None, bool]:
+        """(nearest valid result, whether every launched task before it settled)."""
+        for task in tasks:
+            if not task.done():
+                return None, False
+            if task.result() is not None:
+                return task.result(), True
+        return None, True
+
+    try:
+        while True:
+            now = loop.time()
+            if len(tasks) < len(sites) and now >= next_launch:
+                tasks.append(asyncio.ensure_future(_fetch_gauge(sites[len(tasks)])))
+                next_launch = now + settings.GAUGE_HEDGE_DELAY_S
+
+            result, all_settled = nearest_settled()
+            if result is not None:
+                return result
+            if all_settled:
+                if len(tasks) == len(sites):
+                    return None              # every candidate came back empty
+                next_launch = now            # nothing in flight — hedge immediately
+                continue
+            if now >= deadline:
+                break
+
+            wake = deadline if len(tasks) == len(sites) else min(next_launch, deadline)
+            pending = [t for t in tasks if not t.done()]
+            await asyncio.wait(pending, timeout=max(wake - now, 0), return_when=asyncio.FIRST_COMPLETED)
+
+        # Deadline hit — take the nearest valid answer that did arrive
+        for task in tasks:
+            if task.done() and task.result() is not None:
+                return task.result()
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
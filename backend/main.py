@@ -1,19 +1,56 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 
 from app.config import settings
 from app.database import init_db
 from app.routers import auth, flood, navigation, chat, community
+from app.services.circuit_breaker import breaker_states
+from app.services.executors import ExecutorBusyError, executor_stats, shutdown_executors
+from app.services.flood_ml import flood_model, model_registry
+from app.services.http_client import init_clients, close_clients
+from app.services.nws_service import flush_grid_points
+from app.services.place_search import place_search
+from app.services.response_cache import close_response_caches, response_cache_stats
+from app.services.risk_grid import run_risk_grid_refresher
+from app.services.road_graph import road_graph
+from app.services.risk_cache import risk_cache
+from app.services.risk_events import risk_hub
+from app.services.usgs_service import run_gauge_poller
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Initialize DB and pre-load ML model on startup
+    # Initialize DB on startup; the flood model maps in off the event loop
+    # and requests are rule-scored until it is ready
     await init_db()
-    from app.services.flood_ml import flood_model  # triggers model load/train
+    await init_clients()
+    model_watcher = asyncio.create_task(model_registry.run_watcher())
+    shadow_worker = asyncio.create_task(model_registry.run_shadow_worker())
+    gauge_poller = asyncio.create_task(run_gauge_poller())
+    risk_grid_refresher = (
+        asyncio.create_task(run_risk_grid_refresher()) if settings.RISK_GRID_ENABLED else None
+    )
+    place_search_loader = asyncio.create_task(asyncio.to_thread(place_search.load))
+    road_graph_loader = (
+        asyncio.create_task(asyncio.to_thread(road_graph.load)) if road_graph.configured else None
+    )
     print("✅ waterWise backend ready")
     yield
+    gauge_poller.cancel()
+    if risk_grid_refresher is not None:
+        risk_grid_refresher.cancel()
+    model_watcher.cancel()
+    if road_graph_loader is not None:
+        road_graph_loader.cancel()
+    shadow_worker.cancel()
+    place_search_loader.cancel()
+    await close_clients()
+    shutdown_executors()
+    close_response_caches()
+    flush_grid_points()
 
 
 app = FastAPI(
@@ -31,6 +68,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(ExecutorBusyError)
+async def executor_busy_handler(request: Request, exc: ExecutorBusyError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
 app.include_router(auth.router)
 app.include_router(flood.router)
 app.include_router(navigation.router)
@@ -40,4 +86,15 @@ app.include_router(community.router)
 
 @app.get("/health")
 async def health():
-    return {"status": "ok", "app": "waterWise"}
+    return {
+        "status": "ok",
+        "app": "waterWise",
+        "circuits": breaker_states(),
+        "executors": executor_stats(),
+        "google_cache": response_cache_stats(),
+        "autocomplete": place_search.stats(),
+        "model": flood_model.status(),
+        "risk_cache": risk_cache.stats() if settings.RISK_CACHE_ENABLED else None,
+        "risk_stream": risk_hub.stats(),
+        "road_graph": road_graph.status(),
+    }